@@ -0,0 +1,209 @@
+import copy
+import logging
+import threading
+import boto3
+
+from typing import Any, Dict, Optional, Tuple
+from botocore.config import Config
+
+logr = logging.getLogger(__name__)
+
+
+class ClientPool:
+    """
+    Process-wide registry of boto3 sessions, clients and resources.
+
+    Creating a boto3 client is expensive: it loads service models from disk, builds an endpoint
+    with its own connection pool and pays a fresh TLS handshake on the first request. Clients are
+    thread-safe, hence they are created once per (service, region, profile, config) key and shared.
+    Resources are not thread-safe, hence every thread gets its own resource instance.
+    More on boto3 thread safety:
+    https://boto3.amazonaws.com/v1/documentation/api/latest/guide/clients.html#multithreading-or-multiprocessing-with-clients
+    """
+    # Default botocore config options. Connection pool is bigger than the botocore default (10)
+    # so that multithreaded actions (uploads, parallel deploys) do not block on a free connection.
+    DEFAULT_CONFIG = {
+        'max_pool_connections': 50,
+    }
+
+    __lock = threading.RLock()
+    __local = threading.local()
+    # Incremented by clear(), so that resources cached by any thread before it are dropped.
+    __generation = 0
+    __sessions: Dict[Tuple[Optional[str], Optional[str]], boto3.session.Session] = {}
+    __clients: Dict[Tuple[Any, ...], Any] = {}
+    __stats = {
+        'sessions_created': 0,
+        'clients_created': 0,
+        'clients_reused': 0,
+        'resources_created': 0,
+        'resources_reused': 0,
+    }
+
+    @classmethod
+    def client(
+            cls,
+            service: str,
+            region: Optional[str] = None,
+            profile: Optional[str] = None,
+            config: Optional[Dict[str, Any]] = None,
+            endpoint_url: Optional[str] = None
+    ) -> Any:
+        """
+        Returns a cached (or newly created) boto3 client.
+
+        :param service: AWS service name e.g. s3, cloudformation.
+        :param region: AWS region. Default session region is used if not specified.
+        :param profile: AWS credentials profile. Default credentials chain is used if not specified.
+        :param config: Botocore config options which override DEFAULT_CONFIG.
+        :param endpoint_url: Custom endpoint url e.g. a local stand-in for AWS.
+
+        :return: Boto3 client.
+        """
+        options = cls.__options(config)
+        key = cls.__key(service, region, profile, endpoint_url, options)
+
+        with cls.__lock:
+            client = cls.__clients.get(key)
+
+            if client is not None:
+                cls.__stats['clients_reused'] += 1
+                return client
+
+            logr.debug(f'Creating {service} client for region {region} and profile {profile}...')
+
+            client = cls.__session(region, profile).client(
+                service,
+                endpoint_url=endpoint_url,
+                config=Config(**options)
+            )
+
+            cls.__clients[key] = client
+            cls.__stats['clients_created'] += 1
+
+            return client
+
+    @classmethod
+    def resource(
+            cls,
+            service: str,
+            region: Optional[str] = None,
+            profile: Optional[str] = None,
+            config: Optional[Dict[str, Any]] = None,
+            endpoint_url: Optional[str] = None
+    ) -> Any:
+        """
+        Returns a boto3 resource cached for the current thread.
+
+        :param service: AWS service name e.g. s3.
+        :param region: AWS region. Default session region is used if not specified.
+        :param profile: AWS credentials profile. Default credentials chain is used if not specified.
+        :param config: Botocore config options which override DEFAULT_CONFIG.
+        :param endpoint_url: Custom endpoint url e.g. a local stand-in for AWS.
+
+        :return: Boto3 resource.
+        """
+        options = cls.__options(config)
+        key = cls.__key(service, region, profile, endpoint_url, options)
+
+        with cls.__lock:
+            resources = getattr(cls.__local, 'resources', None)
+
+            if resources is None or cls.__local.generation != cls.__generation:
+                resources = cls.__local.resources = {}
+                cls.__local.generation = cls.__generation
+
+            resource = resources.get(key)
+
+            if resource is not None:
+                cls.__stats['resources_reused'] += 1
+                return resource
+
+            # Sessions are not thread-safe, hence resource creation is guarded by the lock.
+            resource = cls.__session(region, profile).resource(
+                service,
+                endpoint_url=endpoint_url,
+                config=Config(**options)
+            )
+
+            resources[key] = resource
+            cls.__stats['resources_created'] += 1
+
+            return resource
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """
+        Returns counters of how many sessions, clients and resources were created or reused.
+        Every created client owns its own connection pool, hence "clients_created" is also
+        the number of connection pools opened by this process.
+
+        :return: A copy of the counters.
+        """
+        with cls.__lock:
+            return dict(cls.__stats)
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Drops all cached sessions, clients and resources (of every thread) and resets the counters.
+        Other threads drop their resources on their next resource request.
+
+        :return: No return.
+        """
+        with cls.__lock:
+            cls.__sessions.clear()
+            cls.__clients.clear()
+            cls.__generation += 1
+
+            for key in cls.__stats:
+                cls.__stats[key] = 0
+
+    @classmethod
+    def __session(cls, region: Optional[str], profile: Optional[str]) -> boto3.session.Session:
+        """
+        Returns a cached boto3 session. Must be called while holding the lock.
+
+        :param region: AWS region.
+        :param profile: AWS credentials profile.
+
+        :return: Boto3 session.
+        """
+        session = cls.__sessions.get((region, profile))
+
+        if session is None:
+            session = boto3.session.Session(region_name=region, profile_name=profile)
+            cls.__sessions[(region, profile)] = session
+            cls.__stats['sessions_created'] += 1
+
+        return session
+
+    @staticmethod
+    def __key(
+            service: str,
+            region: Optional[str],
+            profile: Optional[str],
+            endpoint_url: Optional[str],
+            options: Dict[str, Any]
+    ) -> Tuple[Any, ...]:
+        """
+        Creates a cache key. Config options may contain unhashable values (e.g. retries dict),
+        hence they are represented as a string.
+
+        :return: Cache key.
+        """
+        return service, region, profile, endpoint_url, repr(sorted(options.items()))
+
+    @classmethod
+    def __options(cls, config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Merges given botocore config options with the default ones. Options are copied, because
+        botocore Config rewrites nested options (e.g. retries) in place, which would change cache keys.
+
+        :param config: Botocore config options.
+
+        :return: Merged options.
+        """
+        options = dict(cls.DEFAULT_CONFIG)
+        options.update(config or {})
+        return copy.deepcopy(options)
@@ -1,8 +1,8 @@
 import logging
-import boto3
 
-from typing import Optional
+from typing import Any, Dict, Optional
 from abc import ABC
+from aws_infrastructure_sdk.client_pool import ClientPool
 
 
 class AbstractStackAction(ABC):
@@ -11,14 +11,30 @@ class AbstractStackAction(ABC):
     More on cloud-formation:
     https://aws.amazon.com/cloudformation/
     """
-    def __init__(self, cf_stack_name: str):
+    def __init__(
+            self,
+            cf_stack_name: str,
+            region: Optional[str] = None,
+            endpoint_url: Optional[str] = None,
+            client_config: Optional[Dict[str, Any]] = None
+    ):
         """
         Constructor.
 
         :param cf_stack_name: The name of cloud-formation stack.
+        :param region: Region of the stack. Default session region is used if not specified.
+        :param endpoint_url: Custom cloud-formation endpoint url e.g. a local stand-in for AWS.
+        :param client_config: Botocore config of the cloud-formation client. Default config is used if not specified.
         """
         self.cf_stack_name = cf_stack_name
-        self.cf_client = boto3.client('cloudformation')
+        self.region = region
+        self.endpoint_url = endpoint_url
+        self.cf_client = ClientPool.client(
+            'cloudformation',
+            region=region,
+            endpoint_url=endpoint_url,
+            config=client_config
+        )
 
     @staticmethod
     def get_logger(name: Optional[str] = None):
@@ -1,7 +1,9 @@
 import logging
-import boto3
+import threading
+import time
 
-from typing import List
+from typing import Dict, Iterable, List, Optional
+from aws_infrastructure_sdk.client_pool import ClientPool
 
 logr = logging.getLogger(__name__)
 
@@ -12,13 +14,23 @@ class ApiGatewayDescriber:
     More on API Gateway:
     https://aws.amazon.com/api-gateway/
     """
-    def __init__(self, gateway_name: str):
+    # Maximum page size allowed by get_rest_apis.
+    PAGE_SIZE = 500
+
+    # Process-wide name -> ids index of rest apis and the time it was loaded.
+    __index: Dict[str, List[str]] = {}
+    __index_loaded: Optional[float] = None
+    __index_lock = threading.Lock()
+
+    def __init__(self, gateway_name: str, ttl: float = 300):
         """
         Constructor.
 
         :param gateway_name: API Gateway name.
+        :param ttl: Time in seconds for which the name index is reused before it is reloaded.
         """
         self.gateway_name = gateway_name
+        self.ttl = ttl
 
     def describe(self) -> str:
         """
@@ -28,16 +40,81 @@ class ApiGatewayDescriber:
         """
         logr.info(f'Getting api gateway rest api id by name {self.gateway_name}...')
 
-        api_id = None
-        api_names: List[str] = []
-        for api in dict(boto3.client('apigateway').get_rest_apis().items())['items']:
-            api_names.append(api['name'])
+        return self.describe_many([self.gateway_name], self.ttl)[self.gateway_name]
+
+    def find(self) -> Optional[str]:
+        """
+        Returns a resource id for specified api gateway if it exists. The name index is reloaded
+        if it does not contain the api gateway, hence a recently created api gateway is found.
+
+        :return: Resource id or None if api gateway does not exist.
+        """
+        ids = self.__load(self.ttl, [self.gateway_name]).get(self.gateway_name, [])
+
+        assert len(ids) <= 1, f'Found {len(ids)} rest apis named {self.gateway_name}: {ids}.'
+
+        return ids[0] if ids else None
+
+    @classmethod
+    def describe_many(cls, gateway_names: Iterable[str], ttl: float = 300) -> Dict[str, str]:
+        """
+        Returns resource ids for many api gateways.
+
+        :param gateway_names: API Gateway names.
+        :param ttl: Time in seconds for which the name index is reused before it is reloaded.
+
+        :return: A map of api gateway name -> resource id.
+        """
+        gateway_names = list(gateway_names)
+        index = cls.__load(ttl, gateway_names)
+        api_ids: Dict[str, str] = {}
+
+        for gateway_name in gateway_names:
+            ids = index.get(gateway_name, [])
+
+            assert ids, f'Rest api id could not be found for {gateway_name}.'
+            assert len(ids) == 1, f'Found {len(ids)} rest apis named {gateway_name}: {ids}.'
+
+            api_ids[gateway_name] = ids[0]
+
+        return api_ids
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """
+        Drops the name index, e.g. after a new api gateway was created.
+
+        :return: No return.
+        """
+        with cls.__index_lock:
+            cls.__index_loaded = None
+
+    @classmethod
+    def __load(cls, ttl: float, gateway_names: List[str]) -> Dict[str, List[str]]:
+        """
+        Returns the name index. Reads all pages of rest apis if the index is older than ttl or
+        if it misses any of given names (e.g. they were created after the index was loaded).
+
+        :param ttl: Time in seconds for which the index is reused.
+        :param gateway_names: API Gateway names which are looked up.
+
+        :return: Name -> ids index.
+        """
+        with cls.__index_lock:
+            fresh = cls.__index_loaded is not None and time.monotonic() - cls.__index_loaded < ttl
+
+            if fresh and all(name in cls.__index for name in gateway_names):
+                return cls.__index
 
-            if api['name'] == self.gateway_name:
-                api_id = api['id']
+            index: Dict[str, List[str]] = {}
+            paginator = ClientPool.client('apigateway').get_paginator('get_rest_apis')
+            for page in paginator.paginate(PaginationConfig={'PageSize': cls.PAGE_SIZE}):
+                for api in page.get('items', []):
+                    index.setdefault(api['name'], []).append(api['id'])
 
-        logr.info(f'Found {len(api_names)} api gateways: {api_names}.')
+            logr.info(f'Found {sum(len(ids) for ids in index.values())} api gateways: {list(index)}.')
 
-        assert api_id, 'Rest api id could not be found.'
+            cls.__index = index
+            cls.__index_loaded = time.monotonic()
 
-        return api_id
+            return index
@@ -0,0 +1,244 @@
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Optional, Set
+from botocore.exceptions import ClientError
+from aws_infrastructure_sdk.client_pool import ClientPool
+from aws_infrastructure_sdk.cloud_formation.stack.stack_deleter import StackDeleter
+from aws_infrastructure_sdk.cloud_formation.stack.stack_deployment_result import StackDeploymentResult
+from aws_infrastructure_sdk.s3.s3_bucket_deleter import S3BucketDeleter
+
+logr = logging.getLogger(__name__)
+
+
+class BulkStackDeleter:
+    """
+    Deletes many cloud-formation stacks selected by a name prefix and/or tags.
+    Stacks which import values are deleted before stacks which export them, independent stacks
+    are deleted concurrently. Buckets owned by a stack are emptied right before the stack is deleted,
+    because cloud-formation can not delete non-empty buckets. Buckets of stacks which are skipped
+    (their exports are still imported) are never touched.
+    """
+    def __init__(
+            self,
+            prefix: Optional[str] = None,
+            tags: Optional[Dict[str, str]] = None,
+            region: Optional[str] = None,
+            endpoint_url: Optional[str] = None,
+            max_workers: int = 4,
+            empty_buckets: bool = True,
+            on_progress: Optional[Callable[[StackDeploymentResult, int, int], None]] = None
+    ) -> None:
+        """
+        Constructor.
+
+        :param prefix: Delete stacks whose names start with this prefix.
+        :param tags: Delete stacks which have all of these tags (key -> value).
+        :param region: Region of stacks. Default session region is used if not specified.
+        :param endpoint_url: Custom endpoint url e.g. a local stand-in for AWS.
+        :param max_workers: Maximum amount of concurrent deletions (and bucket purges).
+        :param empty_buckets: Whether buckets owned by a stack should be emptied before its deletion.
+        :param on_progress: Callback invoked with (result, finished stacks count, total stacks count)
+        every time a stack is finished.
+        """
+        assert prefix or tags, 'Either prefix or tags must be specified.'
+
+        self.prefix = prefix
+        self.tags = tags or {}
+        self.region = region
+        self.endpoint_url = endpoint_url
+        self.max_workers = max_workers
+        self.empty_buckets = empty_buckets
+        self.on_progress = on_progress
+
+        self.cf_client = ClientPool.client('cloudformation', region=region, endpoint_url=endpoint_url)
+
+    def select(self) -> List[Dict[str, Any]]:
+        """
+        Finds stacks matching the prefix and tags.
+
+        :return: A list of stack descriptions (as returned by describe_stacks).
+        """
+        stacks: List[Dict[str, Any]] = []
+
+        for page in self.cf_client.get_paginator('describe_stacks').paginate():
+            for stack in page['Stacks']:
+                if stack['StackStatus'] == 'DELETE_COMPLETE':
+                    continue
+
+                if self.prefix and not stack['StackName'].startswith(self.prefix):
+                    continue
+
+                stack_tags = {tag['Key']: tag['Value'] for tag in stack.get('Tags', [])}
+                if any(stack_tags.get(key) != value for key, value in self.tags.items()):
+                    continue
+
+                stacks.append(stack)
+
+        return stacks
+
+    def dependencies(self, stacks: List[Dict[str, Any]]) -> Dict[str, Set[str]]:
+        """
+        Finds which stacks must be deleted before which. A stack whose export is imported by
+        another stack can be deleted only after the importing stack is deleted.
+
+        :param stacks: Stack descriptions.
+
+        :return: A map of stack name -> names of stacks that must be deleted before it. Importing
+        stacks which are not selected for deletion are included too (they block the deletion).
+        """
+        dependencies: Dict[str, Set[str]] = {stack['StackName']: set() for stack in stacks}
+
+        for stack in stacks:
+            for output in stack.get('Outputs', []):
+                if not output.get('ExportName'):
+                    continue
+
+                for importer in self.__list_imports(output['ExportName']):
+                    if importer != stack['StackName']:
+                        dependencies[stack['StackName']].add(importer)
+
+        return dependencies
+
+    def delete(self) -> Dict[str, StackDeploymentResult]:
+        """
+        Deletes all selected stacks and waits until they are deleted.
+
+        :return: A map of stack name -> deletion result.
+        """
+        start = time.perf_counter()
+
+        stacks = self.select()
+        names = [stack['StackName'] for stack in stacks]
+        logr.info(f'Selected {len(names)} stacks for deletion: {names}.')
+
+        dependencies = self.dependencies(stacks)
+
+        results: Dict[str, StackDeploymentResult] = {}
+        pending = set(names)
+        running: Dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name in sorted(pending):
+                    blockers = dependencies[name]
+
+                    # Importers which are not being deleted or failed to be deleted block the stack forever.
+                    blocked = [
+                        blocker for blocker in blockers
+                        if blocker not in pending and blocker not in running.values() and not (
+                            blocker in results and results[blocker].ok
+                        )
+                    ]
+
+                    if blocked:
+                        result = StackDeploymentResult(name, StackDeploymentResult.SKIPPED, self.region)
+                        result.error = f'Exports are still imported by stacks: {sorted(blocked)}.'
+                        self.__finish(results, result, len(names))
+                        pending.remove(name)
+                    elif all(blocker in results for blocker in blockers):
+                        running[executor.submit(self.__delete_stack, name)] = name
+                        pending.remove(name)
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    self.__finish(results, future.result(), len(names))
+                    running.pop(future)
+
+        failed = [name for name, result in results.items() if not result.ok]
+        logr.info(
+            f'Deleted {len(results) - len(failed)} of {len(results)} stacks '
+            f'in {time.perf_counter() - start:.1f}s. Not deleted: {failed}.'
+        )
+
+        return results
+
+    def __delete_stack(self, name: str) -> StackDeploymentResult:
+        """
+        Empties buckets of a single stack, deletes the stack and waits until it is deleted.
+
+        :param name: The name of cloud-formation stack.
+
+        :return: Deletion result.
+        """
+        if self.empty_buckets:
+            try:
+                self.__empty_buckets(name)
+            except Exception as ex:
+                result = StackDeploymentResult(name, StackDeploymentResult.FAILED, self.region)
+                result.error = f'Failed to empty buckets: {repr(ex)}.'
+                return result
+
+        return StackDeleter(name, self.region, self.endpoint_url).delete_and_wait()
+
+    def __finish(self, results: Dict[str, StackDeploymentResult], result: StackDeploymentResult, total: int) -> None:
+        """
+        Records a finished stack and reports progress.
+
+        :param results: Results collected so far.
+        :param result: Result of the finished stack.
+        :param total: Total amount of stacks.
+
+        :return: No return.
+        """
+        results[result.cf_stack_name] = result
+
+        log = logr.info if result.ok else logr.error
+        log(f'[{len(results)}/{total}] {result}{" " + result.error if result.error else ""}')
+
+        if self.on_progress:
+            self.on_progress(result, len(results), total)
+
+    def __empty_buckets(self, name: str) -> None:
+        """
+        Empties all buckets owned by a stack. Stacks are deleted concurrently, hence buckets
+        of different stacks are emptied concurrently too.
+
+        :param name: Stack name.
+
+        :return: No return.
+        """
+        buckets: List[str] = []
+
+        for page in self.cf_client.get_paginator('list_stack_resources').paginate(StackName=name):
+            for summary in page['StackResourceSummaries']:
+                if (
+                        summary['ResourceType'] == 'AWS::S3::Bucket'
+                        and summary.get('PhysicalResourceId')
+                        and summary['ResourceStatus'] != 'DELETE_COMPLETE'
+                ):
+                    buckets.append(summary['PhysicalResourceId'])
+
+        if not buckets:
+            return
+
+        logr.info(f'Emptying {len(buckets)} buckets of {name}: {buckets}.')
+
+        deleter = S3BucketDeleter(self.region, self.endpoint_url)
+        for bucket in buckets:
+            deleter.empty(bucket)
+
+    def __list_imports(self, export_name: str) -> List[str]:
+        """
+        Lists stacks that import a given export.
+
+        :param export_name: Export name.
+
+        :return: Names of importing stacks.
+        """
+        importers: List[str] = []
+
+        try:
+            for page in self.cf_client.get_paginator('list_imports').paginate(ExportName=export_name):
+                importers.extend(page.get('Imports', []))
+        except ClientError as ex:
+            # Export which is not imported by any stack is reported as an error.
+            if 'is not imported by any stack' not in ex.response['Error']['Message']:
+                raise
+
+        return importers
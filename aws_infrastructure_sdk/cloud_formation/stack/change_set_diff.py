@@ -0,0 +1,92 @@
+from typing import Any, Dict, List, Optional
+
+
+class ChangeSetDiff:
+    """
+    Structured representation of a cloud-formation change set.
+    More on change sets:
+    https://docs.aws.amazon.com/AWSCloudFormation/latest/UserGuide/using-cfn-updating-stacks-changesets.html
+    """
+    def __init__(
+            self,
+            change_set_name: str,
+            change_set_type: str,
+            change_set_id: Optional[str] = None,
+            changes: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        """
+        Constructor.
+
+        :param change_set_name: The name of the change set.
+        :param change_set_type: Type of the change set (CREATE or UPDATE).
+        :param change_set_id: Arn of the change set. None if the change set was deleted because it was empty.
+        :param changes: "Changes" entries of describe_change_set responses.
+        """
+        self.change_set_name = change_set_name
+        self.change_set_type = change_set_type
+        self.change_set_id = change_set_id
+        self.executed = False
+
+        self.added: List[Dict[str, Any]] = []
+        self.modified: List[Dict[str, Any]] = []
+        self.removed: List[Dict[str, Any]] = []
+        # A subset of modified resources which will be (or may be) replaced.
+        self.replaced: List[Dict[str, Any]] = []
+
+        for change in changes or []:
+            resource_change = change.get('ResourceChange')
+
+            if not resource_change:
+                continue
+
+            entry = {
+                'LogicalResourceId': resource_change.get('LogicalResourceId'),
+                'PhysicalResourceId': resource_change.get('PhysicalResourceId'),
+                'ResourceType': resource_change.get('ResourceType'),
+                'Replacement': resource_change.get('Replacement'),
+                'Scope': resource_change.get('Scope', []),
+            }
+
+            action = resource_change.get('Action')
+
+            if action in ['Add', 'Import']:
+                self.added.append(entry)
+            elif action == 'Remove':
+                self.removed.append(entry)
+            else:
+                self.modified.append(entry)
+
+                # Replacement can be "True", "False" or "Conditional".
+                if entry['Replacement'] in ['True', 'Conditional']:
+                    self.replaced.append(entry)
+
+    @property
+    def is_empty(self) -> bool:
+        """
+        Indicates whether the change set contains no changes.
+
+        :return: True if there is nothing to execute, False otherwise.
+        """
+        return not (self.added or self.modified or self.removed)
+
+    def summary(self) -> str:
+        """
+        Creates a human readable summary of the change set.
+
+        :return: Summary string.
+        """
+        if self.is_empty:
+            return f'Change set {self.change_set_name} contains no changes.'
+
+        lines = [
+            f'Change set {self.change_set_name} ({self.change_set_type}): '
+            f'{len(self.added)} to add, {len(self.modified)} to modify '
+            f'({len(self.replaced)} with replacement), {len(self.removed)} to remove.'
+        ]
+
+        for sign, entries in [('+', self.added), ('~', self.modified), ('-', self.removed)]:
+            for entry in entries:
+                replacement = f' (replacement: {entry["Replacement"]})' if entry in self.replaced else ''
+                lines.append(f'  {sign} {entry["LogicalResourceId"]} [{entry["ResourceType"]}]{replacement}')
+
+        return '\n'.join(lines)
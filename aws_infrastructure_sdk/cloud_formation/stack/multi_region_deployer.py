@@ -0,0 +1,139 @@
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from aws_infrastructure_sdk.cloud_formation.stack.stack_deployer import StackDeployer
+from aws_infrastructure_sdk.cloud_formation.stack.stack_deployment_result import StackDeploymentResult
+
+logr = logging.getLogger(__name__)
+
+
+class MultiRegionDeployer:
+    """
+    Deploys the same cloud-formation template to many regions concurrently.
+    Every region gets its own region-scoped clients and its own template bucket.
+    """
+    def __init__(
+            self,
+            cf_stack_name: str,
+            regions: List[str],
+            cf_bucket_prefix: str,
+            parameters: Optional[List[Dict[str, Any]]] = None,
+            region_parameters: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+            max_workers: Optional[int] = None,
+            use_change_set: bool = True,
+            endpoint_url: Optional[str] = None
+    ) -> None:
+        """
+        Constructor.
+
+        :param cf_stack_name: The name of cloud-formation stack (the same in every region).
+        :param regions: Regions to deploy to.
+        :param cf_bucket_prefix: Prefix of template buckets. Bucket names are global, hence a bucket
+        for each region is named "{cf_bucket_prefix}-{region}".
+        :param parameters: Parameters for the template shared by all regions.
+        :param region_parameters: A map of region -> parameters which override shared parameters
+        with the same keys.
+        :param max_workers: Maximum amount of concurrently deployed regions. All regions at once if not specified.
+        :param use_change_set: Whether stacks should be deployed through change sets.
+        :param endpoint_url: Custom endpoint url e.g. a local stand-in for AWS used in tests.
+        """
+        assert regions, 'At least one region must be specified.'
+        assert len(set(regions)) == len(regions), 'Regions must be unique.'
+
+        self.cf_stack_name = cf_stack_name
+        self.regions = regions
+        self.cf_bucket_prefix = cf_bucket_prefix
+        self.parameters = parameters or []
+        self.region_parameters = region_parameters or {}
+        self.max_workers = max_workers or len(regions)
+        self.use_change_set = use_change_set
+        self.endpoint_url = endpoint_url
+
+    def deploy(self, template: str) -> Dict[str, StackDeploymentResult]:
+        """
+        Deploys the template to all regions and waits until every regional stack is complete.
+
+        :param template: Generated cloud-formation template.
+
+        :return: A map of region -> deployment result.
+        """
+        logr.info(f'Deploying stack {self.cf_stack_name} to regions {self.regions}...')
+
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {region: executor.submit(self.__deploy_region, region, template) for region in self.regions}
+            results = {region: future.result() for region, future in futures.items()}
+
+        logr.info(f'Deployed {self.cf_stack_name} to {len(results)} regions in {time.perf_counter() - start:.1f}s.')
+        logr.info('\n' + self.table(results))
+
+        return results
+
+    def region_bucket_name(self, region: str) -> str:
+        """
+        Returns the name of a template bucket for a region.
+
+        :param region: AWS region.
+
+        :return: Bucket name.
+        """
+        return f'{self.cf_bucket_prefix}-{region}'
+
+    def region_parameters_for(self, region: str) -> List[Dict[str, Any]]:
+        """
+        Merges shared parameters with region specific ones.
+
+        :param region: AWS region.
+
+        :return: Template parameters for the region.
+        """
+        merged = {parameter['ParameterKey']: parameter for parameter in self.parameters}
+
+        for parameter in self.region_parameters.get(region, []):
+            merged[parameter['ParameterKey']] = parameter
+
+        return list(merged.values())
+
+    @staticmethod
+    def table(results: Dict[str, StackDeploymentResult]) -> str:
+        """
+        Formats deployment results as a per-region table.
+
+        :param results: A map of region -> deployment result.
+
+        :return: Table as a string.
+        """
+        rows = [['REGION', 'RESULT', 'STACK STATUS', 'ELAPSED', 'WAIT', 'ERROR']]
+
+        for region, result in results.items():
+            rows.append([
+                region,
+                result.result,
+                result.stack_status or '-',
+                f'{result.elapsed:.1f}s',
+                f'{result.timings.get("wait", 0.0):.1f}s',
+                result.error or ''
+            ])
+
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+
+        return '\n'.join('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows)
+
+    def __deploy_region(self, region: str, template: str) -> StackDeploymentResult:
+        """
+        Deploys the template to a single region.
+
+        :param region: AWS region.
+        :param template: Generated cloud-formation template.
+
+        :return: Deployment result.
+        """
+        return StackDeployer(self.cf_stack_name, region, self.endpoint_url).deploy_and_wait(
+            self.region_bucket_name(region),
+            template,
+            self.region_parameters_for(region),
+            self.use_change_set
+        )
@@ -1,3 +1,7 @@
+import threading
+import time
+
+from typing import Any, Dict, Iterable, Optional, Tuple
 from botocore.exceptions import ClientError
 from aws_infrastructure_sdk.cloud_formation.stack.abstract_stack_action import AbstractStackAction
 
@@ -6,14 +10,22 @@ class ResourceDescriber(AbstractStackAction):
     """
     Resources created with cloud-formation stack describer class.
     """
-    def __init__(self, cf_stack_name: str):
+    # Process-wide index of stack resources: stack name -> (load time, stack last updated time, index).
+    __index: Dict[str, Tuple[float, Any, Dict[str, Dict[str, Any]]]] = {}
+    __index_lock = threading.Lock()
+
+    def __init__(self, cf_stack_name: str, ttl: float = 60):
         """
         Constructor.
 
         :param cf_stack_name: The name of cloud-formation stack.
+        :param ttl: Time in seconds for which bulk lookups are served from an in-memory index without
+        checking whether the stack was updated.
         """
         super().__init__(cf_stack_name)
 
+        self.ttl = ttl
+
     def describe(self, logical_resource_id: str):
         """
         Returns physical resource id by a logical resource id.
@@ -30,3 +42,75 @@ class ResourceDescriber(AbstractStackAction):
         except ClientError:
             self.get_logger().warning('Resource with logical id {} does not exist'.format(logical_resource_id))
             raise
+
+    def describe_many(self, logical_resource_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Returns physical resource ids for many logical resource ids. All stack resources are loaded once
+        and lookups are served from an in-memory index.
+
+        :param logical_resource_ids: Ids of the stack resources.
+
+        :return: A map of logical resource id -> physical resource id. Resources which do not exist
+        (or do not have a physical id yet) are mapped to None.
+        """
+        index = self.__resources()
+        physical_ids: Dict[str, Optional[str]] = {}
+
+        for logical_resource_id in logical_resource_ids:
+            if logical_resource_id not in index:
+                self.get_logger().warning('Resource with logical id {} does not exist'.format(logical_resource_id))
+                physical_ids[logical_resource_id] = None
+                continue
+
+            physical_ids[logical_resource_id] = index[logical_resource_id].get('PhysicalResourceId')
+
+        return physical_ids
+
+    def describe_all(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns summaries of all stack resources.
+
+        :return: A map of logical resource id -> resource summary (as returned by list_stack_resources).
+        """
+        return dict(self.__resources())
+
+    def invalidate(self) -> None:
+        """
+        Drops the in-memory index of the stack.
+
+        :return: No return.
+        """
+        with self.__index_lock:
+            self.__index.pop(self.cf_stack_name, None)
+
+    def __resources(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the resource index of the stack. Within TTL the index is served from memory. After TTL
+        the stack's last updated time is checked and the index is reloaded only if the stack has changed.
+
+        :return: Resource index.
+        """
+        with self.__index_lock:
+            cached = self.__index.get(self.cf_stack_name)
+
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            return cached[2]
+
+        stack = self.cf_client.describe_stacks(StackName=self.cf_stack_name)['Stacks'][0]
+        last_updated = stack.get('LastUpdatedTime', stack.get('CreationTime'))
+
+        if cached and cached[1] == last_updated:
+            index = cached[2]
+        else:
+            self.get_logger().info('Loading resources of stack {}...'.format(self.cf_stack_name))
+
+            index = {}
+            paginator = self.cf_client.get_paginator('list_stack_resources')
+            for page in paginator.paginate(StackName=self.cf_stack_name):
+                for summary in page['StackResourceSummaries']:
+                    index[summary['LogicalResourceId']] = summary
+
+        with self.__index_lock:
+            self.__index[self.cf_stack_name] = (time.monotonic(), last_updated, index)
+
+        return index
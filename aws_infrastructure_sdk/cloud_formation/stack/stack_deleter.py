@@ -1,17 +1,24 @@
+import time
+
+from typing import Optional
 from aws_infrastructure_sdk.cloud_formation.stack.abstract_stack_action import AbstractStackAction
+from aws_infrastructure_sdk.cloud_formation.stack.stack_deployment_result import StackDeploymentResult
+from aws_infrastructure_sdk.cloud_formation.stack.stack_waiter import StackWaiter
 
 
 class StackDeleter(AbstractStackAction):
     """
     Cloud-formation stack deleter class.
     """
-    def __init__(self, cf_stack_name: str):
+    def __init__(self, cf_stack_name: str, region: Optional[str] = None, endpoint_url: Optional[str] = None):
         """
         Constructor.
 
         :param cf_stack_name: The name of cloud-formation stack.
+        :param region: Region of the stack. Default session region is used if not specified.
+        :param endpoint_url: Custom cloud-formation endpoint url e.g. a local stand-in for AWS.
         """
-        super().__init__(cf_stack_name)
+        super().__init__(cf_stack_name, region, endpoint_url)
 
     def delete(self):
         """
@@ -21,3 +28,32 @@ class StackDeleter(AbstractStackAction):
         """
         self.get_logger().info('Deleting stack {}...'.format(self.cf_stack_name))
         self.cf_client.delete_stack(StackName=self.cf_stack_name)
+
+    def delete_and_wait(self) -> StackDeploymentResult:
+        """
+        Deletes the cloud-formation stack and waits until the deletion is complete. Never raises -
+        failures are reported in the returned result.
+
+        :return: Deletion result.
+        """
+        start = time.perf_counter()
+        result = StackDeploymentResult(self.cf_stack_name, StackDeploymentResult.SUCCEEDED, self.region)
+
+        try:
+            self.delete()
+
+            waiter = StackWaiter(self.cf_stack_name, region=self.region, endpoint_url=self.endpoint_url)
+            result.stack_status = waiter.wait()
+            result.timings['wait'] = waiter.total_wait_time
+
+            if result.stack_status != 'DELETE_COMPLETE':
+                result.result = StackDeploymentResult.FAILED
+                result.error = 'Stack ended in {} status.'.format(result.stack_status)
+        except Exception as ex:
+            self.get_logger().exception('Deletion of {} failed.'.format(self.cf_stack_name))
+            result.result = StackDeploymentResult.FAILED
+            result.error = repr(ex)
+        finally:
+            result.elapsed = time.perf_counter() - start
+
+        return result
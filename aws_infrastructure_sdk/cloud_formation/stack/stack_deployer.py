@@ -1,5 +1,12 @@
-from typing import Any, Dict, List
+import datetime
+import time
+
+from typing import Any, Dict, List, Optional
+from botocore.exceptions import ClientError, WaiterError
 from aws_infrastructure_sdk.cloud_formation.stack.abstract_stack_action import AbstractStackAction
+from aws_infrastructure_sdk.cloud_formation.stack.change_set_diff import ChangeSetDiff
+from aws_infrastructure_sdk.cloud_formation.stack.stack_deployment_result import StackDeploymentResult
+from aws_infrastructure_sdk.cloud_formation.stack.stack_waiter import StackWaiter
 from aws_infrastructure_sdk.s3.s3_bucket_creator import S3BucketCreator
 from aws_infrastructure_sdk.s3.s3_uploader import S3Uploader
 
@@ -8,15 +15,42 @@ class StackDeployer(AbstractStackAction):
     """
     Cloud-formation stack deployment class.
     """
-    def __init__(self, cf_stack_name: str, region: str):
+    # Status reasons with which cloud-formation reports that a template contains no changes.
+    NO_CHANGES_REASONS = [
+        "The submitted information didn't contain changes",
+        'No updates are to be performed',
+    ]
+
+    # Seconds between change set status checks (the default botocore waiter delay is 30 seconds).
+    CHANGE_SET_POLL_DELAY = 2
+    CHANGE_SET_POLL_ATTEMPTS = 150
+
+    # Maximum size in bytes of a template which can be passed inline (TemplateBody).
+    # Bigger templates must be uploaded to S3 and passed with TemplateURL.
+    # More on limits:
+    # https://docs.aws.amazon.com/AWSCloudFormation/latest/UserGuide/cloudformation-limits.html
+    TEMPLATE_BODY_LIMIT = 51200
+
+    # Maximum length of a change set name.
+    CHANGE_SET_NAME_LIMIT = 128
+
+    # Template delivery paths.
+    TEMPLATE_PATH_INLINE = 'inline'
+    TEMPLATE_PATH_S3 = 's3'
+
+    def __init__(self, cf_stack_name: str, region: str, endpoint_url: Optional[str] = None):
         """
         Constructor.
 
         :param cf_stack_name: The name of cloud-formation stack.
+        :param region: Region where the stack (and its template bucket) is deployed.
+        :param endpoint_url: Custom endpoint url (used for both cloud-formation and S3) e.g. a local stand-in for AWS.
         """
-        super().__init__(cf_stack_name)
+        super().__init__(cf_stack_name, region, endpoint_url)
 
-        self.region = region
+        # Template delivery path and step durations (in seconds) of the last deployment.
+        self.template_path: Optional[str] = None
+        self.timings: Dict[str, float] = {}
 
     def deploy(self, cf_bucket_name: str, template: str, parameters: List[Dict[str, Any]]) -> None:
         """
@@ -29,23 +63,275 @@ class StackDeployer(AbstractStackAction):
         :return: No return.
         """
         self.get_logger().info('Deploying stack {}...'.format(self.cf_stack_name))
-        self.get_logger().info('Uploading cloudformation template to S3...')
-
-        S3BucketCreator(cf_bucket_name, self.region).create()
-        s3_url = S3Uploader(cf_bucket_name).upload_bytes(template.encode('utf-8'))
+        self.timings = {}
 
         kwargs = {
             'StackName': self.cf_stack_name,
-            'TemplateURL': s3_url,
             'Capabilities': [
                 'CAPABILITY_IAM',
             ],
-            'Parameters': parameters
+            'Parameters': parameters,
+            **self.__template_kwargs(cf_bucket_name, template)
         }
 
+        start = time.perf_counter()
+
         try:
             response = self.cf_client.create_stack(**kwargs)
+            self.timings['create_stack'] = time.perf_counter() - start
         except self.cf_client.exceptions.AlreadyExistsException:
-            response = self.cf_client.update_stack(**kwargs)
+            self.timings['create_stack'] = time.perf_counter() - start
+            start = time.perf_counter()
+
+            try:
+                response = self.cf_client.update_stack(**kwargs)
+            except ClientError as ex:
+                if not self.__is_no_changes(ex.response['Error']['Message']):
+                    raise
+
+                self.get_logger().info('Stack {} is up to date. No updates are performed.'.format(self.cf_stack_name))
+                return
+            finally:
+                self.timings['update_stack'] = time.perf_counter() - start
 
         self.get_logger().info('Done! Stack response: {}'.format(response))
+
+    def deploy_with_change_set(
+            self,
+            cf_bucket_name: str,
+            template: str,
+            parameters: List[Dict[str, Any]],
+            execute: bool = True
+    ) -> ChangeSetDiff:
+        """
+        Updates or creates cloud-formation stack through a change set. If the change set
+        contains no changes, it is deleted and nothing is executed.
+
+        :param cf_bucket_name: The name of the S3 bucket where a cloud-formation template should be uploaded.
+        :param template: Generated cloud-formation template.
+        :param parameters: Parameters for the template.
+        :param execute: Whether a non-empty change set should be executed. If False, the change set
+        is left for a review and can be executed later with "execute_change_set" method.
+
+        :return: Structured change set diff.
+        """
+        self.get_logger().info('Deploying stack {} with a change set...'.format(self.cf_stack_name))
+        self.timings = {}
+
+        change_set_type = 'UPDATE' if self.__stack_exists() else 'CREATE'
+        # Stack names can be as long as change set names, hence the stack name prefix is truncated.
+        timestamp = datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
+        prefix = self.cf_stack_name[:self.CHANGE_SET_NAME_LIMIT - len(timestamp) - 1]
+        change_set_name = '{}-{}'.format(prefix, timestamp)
+        template_kwargs = self.__template_kwargs(cf_bucket_name, template)
+
+        start = time.perf_counter()
+        response = self.cf_client.create_change_set(
+            StackName=self.cf_stack_name,
+            ChangeSetName=change_set_name,
+            ChangeSetType=change_set_type,
+            Capabilities=[
+                'CAPABILITY_IAM',
+            ],
+            Parameters=parameters,
+            **template_kwargs
+        )
+
+        change_set_id = response['Id']
+        self.timings['create_change_set'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+
+        try:
+            self.cf_client.get_waiter('change_set_create_complete').wait(
+                ChangeSetName=change_set_id,
+                WaiterConfig={
+                    'Delay': self.CHANGE_SET_POLL_DELAY,
+                    'MaxAttempts': self.CHANGE_SET_POLL_ATTEMPTS
+                }
+            )
+        except WaiterError:
+            description = self.cf_client.describe_change_set(ChangeSetName=change_set_id)
+
+            if not self.__is_no_changes(description.get('StatusReason', '')):
+                self.get_logger().error('Change set {} failed. Reason: {}'.format(
+                    change_set_name,
+                    description.get('StatusReason')
+                ))
+                raise
+
+            self.get_logger().info('Stack {} is up to date. Deleting empty change set...'.format(self.cf_stack_name))
+            self.cf_client.delete_change_set(ChangeSetName=change_set_id)
+            self.timings['wait_change_set'] = time.perf_counter() - start
+
+            return ChangeSetDiff(change_set_name, change_set_type)
+
+        diff = ChangeSetDiff(change_set_name, change_set_type, change_set_id, self.__describe_changes(change_set_id))
+        self.timings['wait_change_set'] = time.perf_counter() - start
+
+        self.get_logger().info(diff.summary())
+
+        for entry in diff.replaced:
+            self.get_logger().warning('Resource {} ({}) will be replaced (replacement: {}).'.format(
+                entry['LogicalResourceId'],
+                entry['PhysicalResourceId'],
+                entry['Replacement']
+            ))
+
+        if execute:
+            self.execute_change_set(diff)
+
+        return diff
+
+    def deploy_and_wait(
+            self,
+            cf_bucket_name: str,
+            template: str,
+            parameters: List[Dict[str, Any]],
+            use_change_set: bool = True
+    ) -> StackDeploymentResult:
+        """
+        Deploys the stack and waits until it reaches a terminal status. Never raises - failures
+        are reported in the returned result.
+
+        :param cf_bucket_name: The name of the S3 bucket where a cloud-formation template should be uploaded.
+        :param template: Generated cloud-formation template.
+        :param parameters: Parameters for the template.
+        :param use_change_set: Whether the stack should be deployed through a change set. A change set
+        without changes is not executed and the stack is not waited for.
+
+        :return: Deployment result.
+        """
+        start = time.perf_counter()
+        since = datetime.datetime.now(datetime.timezone.utc)
+        result = StackDeploymentResult(self.cf_stack_name, StackDeploymentResult.SUCCEEDED, self.region)
+
+        try:
+            if use_change_set:
+                diff = self.deploy_with_change_set(cf_bucket_name, template, parameters)
+                result.timings.update(self.timings)
+
+                if diff.is_empty:
+                    result.result = StackDeploymentResult.UNCHANGED
+                    return result
+            else:
+                self.deploy(cf_bucket_name, template, parameters)
+                result.timings.update(self.timings)
+
+            waiter = StackWaiter(self.cf_stack_name, since=since, region=self.region, endpoint_url=self.endpoint_url)
+            result.stack_status = waiter.wait()
+            result.timings['wait'] = waiter.total_wait_time
+
+            if not waiter.succeeded:
+                result.result = StackDeploymentResult.FAILED
+                result.error = 'Stack ended in {} status.'.format(result.stack_status)
+        except Exception as ex:
+            self.get_logger().exception('Deployment of {} failed.'.format(self.cf_stack_name))
+            result.result = StackDeploymentResult.FAILED
+            result.error = repr(ex)
+        finally:
+            result.elapsed = time.perf_counter() - start
+
+        return result
+
+    def execute_change_set(self, diff: ChangeSetDiff) -> None:
+        """
+        Executes a previously created change set.
+
+        :param diff: Change set diff returned by "deploy_with_change_set" method.
+
+        :return: No return.
+        """
+        if diff.is_empty or not diff.change_set_id:
+            self.get_logger().info('Change set {} is empty. Nothing to execute.'.format(diff.change_set_name))
+            return
+
+        self.get_logger().info('Executing change set {}...'.format(diff.change_set_name))
+
+        start = time.perf_counter()
+        self.cf_client.execute_change_set(ChangeSetName=diff.change_set_id)
+        self.timings['execute_change_set'] = time.perf_counter() - start
+
+        diff.executed = True
+
+    def __describe_changes(self, change_set_id: str) -> List[Dict[str, Any]]:
+        """
+        Reads all changes of a change set (the response is paginated).
+
+        :param change_set_id: Arn of the change set.
+
+        :return: A list of changes.
+        """
+        changes: List[Dict[str, Any]] = []
+        kwargs = {'ChangeSetName': change_set_id}
+
+        while True:
+            response = self.cf_client.describe_change_set(**kwargs)
+            changes.extend(response.get('Changes', []))
+
+            if not response.get('NextToken'):
+                return changes
+
+            kwargs['NextToken'] = response['NextToken']
+
+    def __stack_exists(self) -> bool:
+        """
+        Checks whether the stack exists. Stacks that only hold a pending (never executed) change set
+        are in REVIEW_IN_PROGRESS status and are treated as non-existing.
+
+        :return: True if stack exists, False otherwise.
+        """
+        try:
+            stack = self.cf_client.describe_stacks(StackName=self.cf_stack_name)['Stacks'][0]
+        except ClientError as ex:
+            if 'does not exist' in ex.response['Error']['Message']:
+                return False
+            raise
+
+        return stack['StackStatus'] != 'REVIEW_IN_PROGRESS'
+
+    def __template_kwargs(self, cf_bucket_name: str, template: str) -> Dict[str, Any]:
+        """
+        Creates template arguments for cloud-formation calls. Small templates are passed inline,
+        templates exceeding TemplateBody size limit are uploaded to S3.
+
+        :param cf_bucket_name: The name of the S3 bucket where a cloud-formation template should be uploaded.
+        :param template: Generated cloud-formation template.
+
+        :return: Template arguments.
+        """
+        template_bytes = template.encode('utf-8')
+
+        if len(template_bytes) <= self.TEMPLATE_BODY_LIMIT:
+            self.get_logger().info('Passing cloudformation template inline ({} bytes)...'.format(len(template_bytes)))
+            self.template_path = self.TEMPLATE_PATH_INLINE
+
+            return {'TemplateBody': template}
+
+        self.get_logger().info('Uploading cloudformation template to S3 ({} bytes)...'.format(len(template_bytes)))
+        self.template_path = self.TEMPLATE_PATH_S3
+
+        start = time.perf_counter()
+        S3BucketCreator(cf_bucket_name, self.region, self.endpoint_url).create()
+        self.timings['bucket_create'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        s3_url = S3Uploader(
+            cf_bucket_name,
+            content_addressed=True,
+            region=self.region,
+            endpoint_url=self.endpoint_url
+        ).upload_bytes(template_bytes)
+        self.timings['template_upload'] = time.perf_counter() - start
+
+        return {'TemplateURL': s3_url}
+
+    def __is_no_changes(self, reason: str) -> bool:
+        """
+        Checks whether a cloud-formation error (or status reason) says that there are no changes.
+
+        :param reason: Error message or status reason.
+
+        :return: True if no changes are to be performed, False otherwise.
+        """
+        return any(no_changes_reason in reason for no_changes_reason in self.NO_CHANGES_REASONS)
@@ -0,0 +1,43 @@
+from typing import Dict, Optional
+
+
+class StackDeploymentResult:
+    """
+    Result of a single stack operation (deployment or deletion).
+    """
+    SUCCEEDED = 'SUCCEEDED'
+    UNCHANGED = 'UNCHANGED'
+    FAILED = 'FAILED'
+    SKIPPED = 'SKIPPED'
+
+    def __init__(self, cf_stack_name: str, result: str, region: Optional[str] = None):
+        """
+        Constructor.
+
+        :param cf_stack_name: The name of cloud-formation stack.
+        :param result: One of SUCCEEDED, UNCHANGED, FAILED, SKIPPED.
+        :param region: Region where the stack is deployed.
+        """
+        self.cf_stack_name = cf_stack_name
+        self.result = result
+        self.region = region
+
+        # Terminal cloud-formation status of the stack (if it was deployed).
+        self.stack_status: Optional[str] = None
+        # Error which caused a failure, or a reason of skipping.
+        self.error: Optional[str] = None
+        # Total deployment time in seconds and durations of separate steps.
+        self.elapsed = 0.0
+        self.timings: Dict[str, float] = {}
+
+    @property
+    def ok(self) -> bool:
+        """
+        Indicates whether the stack is deployed and up to date.
+
+        :return: True if deployment succeeded or nothing had to be changed.
+        """
+        return self.result in [self.SUCCEEDED, self.UNCHANGED]
+
+    def __repr__(self) -> str:
+        return f'{self.cf_stack_name}: {self.result} ({self.stack_status}, {self.elapsed:.1f}s)'
@@ -0,0 +1,233 @@
+import json
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Any, Dict, Iterable, List, Optional, Set
+from aws_infrastructure_sdk.cloud_formation.stack.stack_deployer import StackDeployer
+from aws_infrastructure_sdk.cloud_formation.stack.stack_deployment_result import StackDeploymentResult
+
+logr = logging.getLogger(__name__)
+
+
+class StackOrchestrator:
+    """
+    Deploys many cloud-formation stacks concurrently respecting dependencies between them.
+    Dependencies are inferred from stack exports and Fn::ImportValue references and can be
+    specified explicitly. Independent stacks are deployed in parallel, hence total deployment
+    time approaches the longest dependency chain rather than the sum of all stacks.
+    """
+    def __init__(
+            self,
+            templates: Dict[str, str],
+            region: str,
+            cf_bucket_name: str,
+            parameters: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+            dependencies: Optional[Dict[str, Iterable[str]]] = None,
+            max_workers: int = 4,
+            use_change_set: bool = True
+    ) -> None:
+        """
+        Constructor.
+
+        :param templates: A map of cloud-formation stack name -> JSON template (e.g. Template.to_json()).
+        :param region: Region where stacks are deployed.
+        :param cf_bucket_name: The name of the S3 bucket where big templates are uploaded.
+        :param parameters: A map of stack name -> parameters for the template.
+        :param dependencies: Explicit dependencies: a map of stack name -> names of stacks it depends on.
+        :param max_workers: Maximum amount of concurrently deployed stacks.
+        :param use_change_set: Whether stacks should be deployed through change sets. Stacks without
+        changes are then skipped without waiting.
+        """
+        self.templates = templates
+        self.region = region
+        self.cf_bucket_name = cf_bucket_name
+        self.parameters = parameters or {}
+        self.max_workers = max_workers
+        self.use_change_set = use_change_set
+
+        self.dependencies = self.infer_dependencies(templates)
+
+        for name, upstream in (dependencies or {}).items():
+            assert name in templates, f'Unknown stack {name} in dependencies.'
+
+            for upstream_name in upstream:
+                assert upstream_name in templates, f'Unknown stack {upstream_name} in dependencies.'
+                self.dependencies[name].add(upstream_name)
+
+        self.__assert_acyclic()
+
+    @classmethod
+    def infer_dependencies(cls, templates: Dict[str, str]) -> Dict[str, Set[str]]:
+        """
+        Infers dependencies between stacks by matching Fn::ImportValue references against export names.
+        Export and import names are resolved when they are plain strings or use Fn::Sub / Fn::Join
+        with AWS::StackName pseudo parameter. Other names are ignored.
+
+        :param templates: A map of cloud-formation stack name -> JSON template.
+
+        :return: A map of stack name -> names of stacks it depends on.
+        """
+        parsed: Dict[str, Dict[str, Any]] = {}
+        for name, template in templates.items():
+            try:
+                parsed[name] = json.loads(template)
+            except ValueError:
+                logr.warning(f'Template of {name} is not a JSON template. Dependencies must be specified explicitly.')
+                parsed[name] = {}
+
+        exports: Dict[str, str] = {}
+        for name, template in parsed.items():
+            for output in template.get('Outputs', {}).values():
+                export_name = cls.__resolve(output.get('Export', {}).get('Name'), name)
+
+                if export_name:
+                    exports[export_name] = name
+
+        dependencies: Dict[str, Set[str]] = {name: set() for name in templates}
+        for name, template in parsed.items():
+            for imported in cls.__find_imports(template):
+                import_name = cls.__resolve(imported, name)
+
+                if import_name is None:
+                    logr.debug(f'Could not resolve import {imported} of {name}.')
+                elif import_name in exports and exports[import_name] != name:
+                    dependencies[name].add(exports[import_name])
+
+        return dependencies
+
+    def deploy(self) -> Dict[str, StackDeploymentResult]:
+        """
+        Deploys all stacks. A stack is deployed as soon as all its dependencies are deployed.
+        If a stack fails, all stacks depending on it (directly or indirectly) are skipped.
+
+        :return: A map of stack name -> deployment result.
+        """
+        start = time.perf_counter()
+
+        results: Dict[str, StackDeploymentResult] = {}
+        pending = set(self.templates)
+        running: Dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name in sorted(pending):
+                    upstream = self.dependencies[name]
+
+                    failed = [dep for dep in upstream if dep in results and not results[dep].ok]
+                    if failed:
+                        result = StackDeploymentResult(name, StackDeploymentResult.SKIPPED, self.region)
+                        result.error = f'Upstream stacks failed: {failed}.'
+                        logr.error(f'Skipping {name}. {result.error}')
+                        results[name] = result
+                        pending.remove(name)
+                    elif all(dep in results for dep in upstream):
+                        running[executor.submit(self.__deploy_stack, name)] = name
+                        pending.remove(name)
+
+                if not running:
+                    # Skipped stacks may unblock (skip) their dependents.
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+
+        logr.info(f'Deployed {len(results)} stacks in {time.perf_counter() - start:.1f}s: {list(results.values())}.')
+
+        return results
+
+    def __deploy_stack(self, name: str) -> StackDeploymentResult:
+        """
+        Deploys a single stack and waits until it is complete.
+
+        :param name: The name of cloud-formation stack.
+
+        :return: Deployment result.
+        """
+        return StackDeployer(name, self.region).deploy_and_wait(
+            self.cf_bucket_name,
+            self.templates[name],
+            self.parameters.get(name, []),
+            self.use_change_set
+        )
+
+    def __assert_acyclic(self) -> None:
+        """
+        Ensures that stack dependencies contain no cycles.
+
+        :return: No return.
+        """
+        visited: Set[str] = set()
+        visiting: Set[str] = set()
+
+        def visit(name: str, path: List[str]) -> None:
+            if name in visited:
+                return
+
+            if name in visiting:
+                raise ValueError(f'Stack dependencies contain a cycle: {" -> ".join(path + [name])}.')
+
+            visiting.add(name)
+            for upstream in sorted(self.dependencies[name]):
+                visit(upstream, path + [name])
+            visiting.remove(name)
+            visited.add(name)
+
+        for stack_name in sorted(self.dependencies):
+            visit(stack_name, [])
+
+    @classmethod
+    def __find_imports(cls, node: Any) -> List[Any]:
+        """
+        Recursively finds values of all Fn::ImportValue functions in a template.
+
+        :param node: Template node.
+
+        :return: A list of imported names (unresolved).
+        """
+        imports: List[Any] = []
+
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == 'Fn::ImportValue':
+                    imports.append(value)
+                else:
+                    imports.extend(cls.__find_imports(value))
+        elif isinstance(node, list):
+            for value in node:
+                imports.extend(cls.__find_imports(value))
+
+        return imports
+
+    @classmethod
+    def __resolve(cls, value: Any, cf_stack_name: str) -> Optional[str]:
+        """
+        Resolves an export/import name to a string.
+
+        :param value: Name as it appears in a template.
+        :param cf_stack_name: The name of the stack the template belongs to.
+
+        :return: Resolved name or None if it can not be resolved statically.
+        """
+        if isinstance(value, str):
+            return value
+
+        if not isinstance(value, dict) or len(value) != 1:
+            return None
+
+        if value.get('Ref') == 'AWS::StackName':
+            return cf_stack_name
+
+        if 'Fn::Sub' in value and isinstance(value['Fn::Sub'], str):
+            resolved = value['Fn::Sub'].replace('${AWS::StackName}', cf_stack_name)
+            return None if '${' in resolved else resolved
+
+        if 'Fn::Join' in value:
+            separator, parts = value['Fn::Join']
+            resolved_parts = [cls.__resolve(part, cf_stack_name) for part in parts]
+            return None if None in resolved_parts else separator.join(resolved_parts)
+
+        return None
@@ -0,0 +1,276 @@
+import datetime
+import random
+import time
+
+from typing import Any, Callable, Dict, Generator, List, Optional
+from botocore.exceptions import ClientError
+from aws_infrastructure_sdk.cloud_formation.stack.abstract_stack_action import AbstractStackAction
+
+
+class StackWaiter(AbstractStackAction):
+    """
+    Cloud-formation stack waiter class which waits until a stack reaches a terminal status
+    and streams stack events while waiting.
+    """
+    # Statuses which indicate a successful stack operation.
+    SUCCESS_STATUSES = [
+        'CREATE_COMPLETE',
+        'UPDATE_COMPLETE',
+        'DELETE_COMPLETE',
+        'IMPORT_COMPLETE',
+    ]
+
+    # Status of a stack created by a change set which was not executed yet.
+    REVIEW_STATUS = 'REVIEW_IN_PROGRESS'
+
+    # Time in seconds for which a stack can stay in review status (right after a change set of a new
+    # stack is executed) before it is considered terminal (a change set which nobody executes).
+    REVIEW_GRACE_PERIOD = 60
+
+    # Default maximum wait time in seconds.
+    DEFAULT_TIMEOUT = 2 * 60 * 60
+
+    # Error codes with which AWS reports request throttling.
+    THROTTLING_ERROR_CODES = [
+        'Throttling',
+        'ThrottlingException',
+        'RequestLimitExceeded',
+    ]
+
+    # Botocore config for waiter clients. Adaptive retry mode rate-limits requests on the client side,
+    # and since clients are shared, many concurrent waiters share the same rate limiter.
+    CLIENT_CONFIG = {
+        'retries': {
+            'mode': 'adaptive',
+            'max_attempts': 10,
+        }
+    }
+
+    def __init__(
+            self,
+            cf_stack_name: str,
+            min_delay: float = 2,
+            max_delay: float = 30,
+            backoff: float = 1.5,
+            timeout: Optional[float] = DEFAULT_TIMEOUT,
+            since: Optional[datetime.datetime] = None,
+            region: Optional[str] = None,
+            endpoint_url: Optional[str] = None
+    ):
+        """
+        Constructor.
+
+        :param cf_stack_name: The name of cloud-formation stack.
+        :param min_delay: Minimum delay in seconds between polls. Used while the stack emits new events.
+        :param max_delay: Maximum delay in seconds between polls.
+        :param backoff: Multiplier applied to the delay after every poll without new events.
+        :param timeout: Maximum wait time in seconds. Waits indefinitely if None.
+        :param since: Stream events that happened after this (timezone aware) time. If not specified,
+        only events that appear after the first poll are streamed.
+        :param region: Region of the stack. Default session region is used if not specified.
+        :param endpoint_url: Custom cloud-formation endpoint url e.g. a local stand-in for AWS.
+        """
+        super().__init__(cf_stack_name, region, endpoint_url, self.CLIENT_CONFIG)
+
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.timeout = timeout
+        self.since = since
+
+        # Terminal stack status. Available after waiting is finished.
+        self.status: Optional[str] = None
+
+        self.__stack_id: Optional[str] = None
+        self.__last_event_id: Optional[str] = None
+        self.__cursor_ready = False
+        self.__wait_time = 0.0
+
+    @property
+    def total_wait_time(self) -> float:
+        """
+        Returns total time in seconds spent waiting for the stack.
+
+        :return: Wait time in seconds.
+        """
+        return self.__wait_time
+
+    @property
+    def succeeded(self) -> bool:
+        """
+        Indicates whether the stack reached a successful terminal status.
+
+        :return: True if stack operation succeeded, False otherwise.
+        """
+        return self.status in self.SUCCESS_STATUSES
+
+    @staticmethod
+    def is_terminal(status: str) -> bool:
+        """
+        Checks whether a stack status is terminal.
+
+        :param status: Stack status.
+
+        :return: True if no further status changes are expected, False otherwise.
+        """
+        return 'IN_PROGRESS' not in status and (status.endswith('_COMPLETE') or status.endswith('_FAILED'))
+
+    def wait(self, on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> str:
+        """
+        Waits until the stack reaches a terminal status and logs stack events.
+
+        :param on_event: Optional callback invoked with every new stack event.
+
+        :return: Terminal stack status.
+        """
+        for event in self.events():
+            self.get_logger().info('{} {} [{}] {} {}'.format(
+                self.cf_stack_name,
+                event['LogicalResourceId'],
+                event['ResourceType'],
+                event['ResourceStatus'],
+                event.get('ResourceStatusReason', '')
+            ))
+
+            if on_event:
+                on_event(event)
+
+        return self.status
+
+    def events(self) -> Generator[Dict[str, Any], None, None]:
+        """
+        Polls the stack with adaptive backoff and yields new stack events in chronological order
+        until the stack reaches a terminal status. Every event is fetched only once. A stack which stays
+        in review status (its change set is not executed) longer than the grace period is considered terminal.
+
+        :return: Stack events generator.
+        """
+        self.get_logger().info('Waiting for stack {}...'.format(self.cf_stack_name))
+
+        start = time.perf_counter()
+        delay = self.min_delay
+        # Time when the stack was first seen in review status.
+        review_start: Optional[float] = None
+
+        try:
+            while True:
+                try:
+                    status = self.__describe_status()
+                    new_events = self.__new_events()
+                except ClientError as ex:
+                    if ex.response['Error']['Code'] not in self.THROTTLING_ERROR_CODES:
+                        raise
+
+                    delay = min(self.max_delay, delay * 2)
+                    self.get_logger().warning('Throttled while waiting for {}. Retrying in {:.1f}s.'.format(
+                        self.cf_stack_name,
+                        delay
+                    ))
+                    self.__sleep(delay, start)
+                    continue
+
+                for event in new_events:
+                    yield event
+
+                if status == self.REVIEW_STATUS:
+                    review_start = review_start or time.perf_counter()
+                else:
+                    review_start = None
+
+                in_review = time.perf_counter() - review_start if review_start is not None else 0.0
+                stuck_in_review = in_review > self.REVIEW_GRACE_PERIOD
+
+                if self.is_terminal(status) or stuck_in_review:
+                    self.status = status
+                    self.get_logger().info('Stack {} reached status {} in {:.1f}s.'.format(
+                        self.cf_stack_name,
+                        status,
+                        time.perf_counter() - start
+                    ))
+                    return
+
+                # Poll often while the stack is active, back off while it is quiet.
+                delay = self.min_delay if new_events else min(self.max_delay, delay * self.backoff)
+                self.__sleep(delay, start)
+        finally:
+            self.__wait_time += time.perf_counter() - start
+
+    def __sleep(self, delay: float, start: float) -> None:
+        """
+        Sleeps for a given delay with a small jitter, so many concurrent waiters do not poll in lockstep.
+
+        :param delay: Delay in seconds.
+        :param start: Start of waiting (perf counter value).
+
+        :return: No return.
+        """
+        if self.timeout is not None and time.perf_counter() - start + delay > self.timeout:
+            raise TimeoutError('Stack {} did not reach a terminal status in {}s.'.format(
+                self.cf_stack_name,
+                self.timeout
+            ))
+
+        time.sleep(delay + random.uniform(0, delay * 0.1))
+
+    def __describe_status(self) -> str:
+        """
+        Returns current stack status. Stack id is used after the first call, so deleted
+        stacks can still be described.
+
+        :return: Stack status.
+        """
+        try:
+            stack = self.cf_client.describe_stacks(StackName=self.__stack_id or self.cf_stack_name)['Stacks'][0]
+        except ClientError as ex:
+            # Stack which is deleted and was never described by id is not found by name anymore.
+            if self.__stack_id is None and 'does not exist' in ex.response['Error']['Message']:
+                return 'DELETE_COMPLETE'
+            raise
+
+        self.__stack_id = stack['StackId']
+        return stack['StackStatus']
+
+    def __new_events(self) -> List[Dict[str, Any]]:
+        """
+        Fetches stack events newer than the cursor (the last seen event). Events are returned
+        newest first by the API, hence pages are read only until the cursor is reached.
+
+        :return: New events in chronological order.
+        """
+        if self.__stack_id is None:
+            return []
+
+        if not self.__cursor_ready and self.since is None:
+            # Without a "since" time the cursor starts at the latest existing event.
+            events = self.cf_client.describe_stack_events(StackName=self.__stack_id).get('StackEvents', [])
+            self.__last_event_id = events[0]['EventId'] if events else None
+            self.__cursor_ready = True
+            return []
+
+        new_events: List[Dict[str, Any]] = []
+        kwargs = {'StackName': self.__stack_id}
+
+        while True:
+            response = self.cf_client.describe_stack_events(**kwargs)
+            reached_cursor = False
+
+            for event in response.get('StackEvents', []):
+                if event['EventId'] == self.__last_event_id:
+                    reached_cursor = True
+                    break
+
+                if self.since is not None and event['Timestamp'] < self.since:
+                    reached_cursor = True
+                    break
+
+                new_events.append(event)
+
+            if reached_cursor or not response.get('NextToken'):
+                break
+
+            kwargs['NextToken'] = response['NextToken']
+
+        if new_events:
+            self.__last_event_id = new_events[0]['EventId']
+
+        return list(reversed(new_events))
@@ -1,8 +1,8 @@
 import logging
-import boto3
 
-from typing import Optional
+from typing import Any, Optional
 from abc import ABC
+from aws_infrastructure_sdk.client_pool import ClientPool
 
 
 class AbstractS3Action(ABC):
@@ -11,12 +11,25 @@ class AbstractS3Action(ABC):
     More on S3:
     https://aws.amazon.com/s3/
     """
-    def __init__(self):
+    def __init__(self, region: Optional[str] = None, endpoint_url: Optional[str] = None):
         """
         Constructor.
+
+        :param region: Region of S3 clients. Default session region is used if not specified.
+        :param endpoint_url: Custom S3 endpoint url e.g. a local stand-in for AWS.
+        """
+        self.region = region
+        self.endpoint_url = endpoint_url
+        self.s3_client = ClientPool.client('s3', region=region, endpoint_url=endpoint_url)
+
+    @property
+    def s3_resource(self) -> Any:
+        """
+        Returns an S3 resource. Resources are not thread-safe, hence every thread gets its own instance.
+
+        :return: S3 resource.
         """
-        self.s3_client = boto3.client('s3')
-        self.s3_resource = boto3.resource('s3')
+        return ClientPool.resource('s3', region=self.region, endpoint_url=self.endpoint_url)
 
     @staticmethod
     def get_logger(name: Optional[str] = None):
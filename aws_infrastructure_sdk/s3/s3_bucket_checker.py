@@ -1,6 +1,72 @@
+import heapq
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Generator, List, Tuple
 from aws_infrastructure_sdk.s3.s3_abstract_action import AbstractS3Action
 
 
+class S3BucketStats:
+    """
+    Aggregate statistics of S3 objects. Uses constant memory regardless of the amount of objects.
+    """
+    def __init__(self, top: int = 10):
+        """
+        Constructor.
+
+        :param top: Amount of largest objects to keep track of.
+        """
+        self.top = top
+        self.objects = 0
+        self.bytes = 0
+        # Min-heap of (size, key) pairs of the largest objects.
+        self.__largest: List[Tuple[int, str]] = []
+
+    @property
+    def largest(self) -> List[Tuple[str, int]]:
+        """
+        Returns the largest objects.
+
+        :return: A list of (key, size) pairs sorted by size descending.
+        """
+        return [(key, size) for size, key in sorted(self.__largest, reverse=True)]
+
+    def add(self, key: str, size: int) -> None:
+        """
+        Accounts a single object.
+
+        :param key: Object key.
+        :param size: Object size in bytes.
+
+        :return: No return.
+        """
+        self.objects += 1
+        self.bytes += size
+
+        if len(self.__largest) < self.top:
+            heapq.heappush(self.__largest, (size, key))
+        elif size > self.__largest[0][0]:
+            heapq.heapreplace(self.__largest, (size, key))
+
+    def merge(self, other: 'S3BucketStats') -> None:
+        """
+        Merges statistics of another (disjoint) set of objects into these statistics.
+
+        :param other: Other statistics.
+
+        :return: No return.
+        """
+        objects, total = self.objects, self.bytes
+
+        for key, size in other.largest:
+            self.add(key, size)
+
+        self.objects = objects + other.objects
+        self.bytes = total + other.bytes
+
+    def __repr__(self) -> str:
+        return f'{self.objects} objects, {self.bytes} bytes, largest: {self.largest}'
+
+
 class S3BucketChecker(AbstractS3Action):
     """
     Checker class that does various checks against S3 buckets.
@@ -13,5 +79,69 @@ class S3BucketChecker(AbstractS3Action):
 
         :return: True if bucket empty, False otherwise.
         """
-        resp = self.s3_client.list_objects_v2(Bucket=bucket_name)
-        return len(resp['Contents']) == 0
+        resp = self.s3_client.list_objects_v2(Bucket=bucket_name, MaxKeys=1)
+        return resp['KeyCount'] == 0
+
+    def objects(self, bucket_name: str, prefix: str = '') -> Generator[Dict[str, Any], None, None]:
+        """
+        Lazily iterates over objects of a bucket. Pages are fetched only when they are needed.
+
+        :param bucket_name: The name of S3 bucket.
+        :param prefix: Iterate only over keys with this prefix.
+
+        :return: Generator of object summaries (as returned by list_objects_v2).
+        """
+        for page in self.s3_client.get_paginator('list_objects_v2').paginate(Bucket=bucket_name, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                yield obj
+
+    def stats(
+            self,
+            bucket_name: str,
+            prefix: str = '',
+            top: int = 10,
+            parallel: bool = False,
+            delimiter: str = '/',
+            max_workers: int = 8
+    ) -> S3BucketStats:
+        """
+        Calculates aggregate statistics (object count, total size, largest objects) of a bucket.
+
+        :param bucket_name: The name of S3 bucket.
+        :param prefix: Account only keys with this prefix.
+        :param top: Amount of largest objects to report.
+        :param parallel: If True, keys are listed concurrently for every common prefix (directory)
+        directly under the given prefix.
+        :param delimiter: Delimiter which separates common prefixes.
+        :param max_workers: Maximum amount of concurrent listings.
+
+        :return: Bucket statistics.
+        """
+        if not parallel:
+            stats = S3BucketStats(top)
+
+            for obj in self.objects(bucket_name, prefix):
+                stats.add(obj['Key'], obj['Size'])
+
+            return stats
+
+        stats = S3BucketStats(top)
+        prefixes: List[str] = []
+
+        # Objects directly under the prefix are accounted here, deeper objects - per common prefix.
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix, Delimiter=delimiter):
+            for obj in page.get('Contents', []):
+                stats.add(obj['Key'], obj['Size'])
+
+            prefixes.extend(common['Prefix'] for common in page.get('CommonPrefixes', []))
+
+        self.get_logger().info(f'Listing {len(prefixes)} prefixes of {bucket_name} concurrently...')
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.stats, bucket_name, common, top) for common in prefixes]
+
+            for future in futures:
+                stats.merge(future.result())
+
+        return stats
@@ -1,54 +1,163 @@
-import time
+import threading
+import warnings
 
-from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional, Set, Tuple
+from botocore.exceptions import ClientError, WaiterError
 from aws_infrastructure_sdk.s3.s3_abstract_action import AbstractS3Action
 
 
 class S3BucketCreator(AbstractS3Action):
-    def __init__(self, bucket_name: str, region: str):
+    # Bounded wait for a bucket to become available: delay in seconds and attempts.
+    WAIT_DELAY = 2
+    WAIT_ATTEMPTS = 15
+
+    # Process-wide cache of (endpoint url, bucket name) pairs known to exist.
+    __existing: Set[Tuple[Optional[str], str]] = set()
+    __existing_lock = threading.Lock()
+
+    def __init__(self, bucket_name: str, region: str, endpoint_url: Optional[str] = None):
         """
         Constructor.
 
         :param bucket_name: The name of S3 bucket.
         :param region: Region where a bucket exists.
+        :param endpoint_url: Custom S3 endpoint url e.g. a local stand-in for AWS.
         """
-        super().__init__()
+        super().__init__(region, endpoint_url)
 
-        self.region = region
         self.bucket_name = bucket_name
 
     def create(self, recursion: bool = False) -> None:
         """
         Creates an S3 bucket if it does not exist.
 
-        :param recursion: Indicates if this function is in recursion.
+        :param recursion: Deprecated and ignored. Conflicting creates are waited for instead of retried.
 
         :return: No return.
         """
-        exists = self.bucket_name in [bucket['Name'] for bucket in self.s3_client.list_buckets()['Buckets']]
+        if recursion:
+            warnings.warn('"recursion" argument of S3BucketCreator.create is deprecated and ignored.', DeprecationWarning)
+
+        if self.__is_cached():
+            self.get_logger().debug('Bucket {} already exists (cached).'.format(self.bucket_name))
+            return
 
         # If bucket does not exist - create it.
-        if not exists:
+        if not self.exists():
             self.get_logger().info('Bucket does not exist. Creating {}...'.format(self.bucket_name))
 
+            kwargs = {
+                'Bucket': self.bucket_name,
+                'ACL': 'private',
+            }
+
+            # Buckets in us-east-1 must be created without a location constraint.
+            if self.region != 'us-east-1':
+                kwargs['CreateBucketConfiguration'] = {'LocationConstraint': self.region}
+
             try:
-                self.s3_client.create_bucket(
-                    Bucket=self.bucket_name,
-                    ACL='private',
-                    CreateBucketConfiguration={
-                        'LocationConstraint': self.region
-                    }
-                )
+                self.s3_client.create_bucket(**kwargs)
             except ClientError as ex:
-                if recursion is True:
-                    raise
-
                 if ex.response['Error']['Code'] == 'BucketAlreadyOwnedByYou':
                     self.get_logger().info('Bucket {} already exists.'.format(self.bucket_name))
                 elif ex.response['Error']['Code'] == 'OperationAborted':
-                    time.sleep(2)
-                    self.create(True)
+                    # A conflicting operation (e.g. a concurrent create) is in progress.
+                    self.get_logger().info('Bucket {} is being created. Waiting...'.format(self.bucket_name))
                 else:
                     raise
+
+            self.__wait_until_exists()
         else:
             self.get_logger().info('Bucket {} already exists.'.format(self.bucket_name))
+
+        self.__cache()
+
+    def exists(self) -> bool:
+        """
+        Checks whether the bucket exists with a single head_bucket call.
+
+        :return: True if bucket exists and is accessible, False otherwise.
+        """
+        try:
+            self.s3_client.head_bucket(Bucket=self.bucket_name)
+            return True
+        except ClientError as ex:
+            if ex.response['Error']['Code'] in ['404', 'NoSuchBucket', 'NotFound']:
+                return False
+            raise
+
+    @staticmethod
+    def ensure_buckets(
+            bucket_names: Iterable[str],
+            region: str,
+            endpoint_url: Optional[str] = None,
+            max_workers: int = 8
+    ) -> None:
+        """
+        Creates many buckets concurrently (if they do not exist).
+
+        :param bucket_names: Names of S3 buckets.
+        :param region: Region where buckets exist.
+        :param endpoint_url: Custom S3 endpoint url e.g. a local stand-in for AWS.
+        :param max_workers: Maximum amount of concurrently created buckets.
+
+        :return: No return.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(S3BucketCreator(bucket_name, region, endpoint_url).create)
+                for bucket_name in set(bucket_names)
+            ]
+
+            for future in futures:
+                future.result()
+
+    @classmethod
+    def forget(cls, bucket_name: str, endpoint_url: Optional[str] = None) -> None:
+        """
+        Removes a bucket from the cache of existing buckets, e.g. after the bucket was deleted.
+
+        :param bucket_name: The name of S3 bucket.
+        :param endpoint_url: Custom S3 endpoint url the bucket belongs to.
+
+        :return: No return.
+        """
+        with cls.__existing_lock:
+            cls.__existing.discard((endpoint_url, bucket_name))
+
+    def __wait_until_exists(self) -> None:
+        """
+        Waits (bounded) until the bucket exists.
+
+        :return: No return.
+        """
+        try:
+            self.s3_client.get_waiter('bucket_exists').wait(
+                Bucket=self.bucket_name,
+                WaiterConfig={
+                    'Delay': self.WAIT_DELAY,
+                    'MaxAttempts': self.WAIT_ATTEMPTS
+                }
+            )
+        except WaiterError:
+            self.get_logger().error('Bucket {} did not become available in time.'.format(self.bucket_name))
+            raise
+
+    def __is_cached(self) -> bool:
+        """
+        Checks whether the bucket is known to exist.
+
+        :return: True if bucket was already created or found in this process.
+        """
+        with self.__existing_lock:
+            return (self.endpoint_url, self.bucket_name) in self.__existing
+
+    def __cache(self) -> None:
+        """
+        Remembers that the bucket exists.
+
+        :return: No return.
+        """
+        with self.__existing_lock:
+            self.__existing.add((self.endpoint_url, self.bucket_name))
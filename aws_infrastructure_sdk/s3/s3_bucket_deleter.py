@@ -1,30 +1,196 @@
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from botocore.exceptions import ClientError
 from aws_infrastructure_sdk.s3.s3_abstract_action import AbstractS3Action
+from aws_infrastructure_sdk.s3.s3_bucket_creator import S3BucketCreator
+
+
+class S3BucketDeletionResult:
+    """
+    Statistics of a single bucket purge/deletion.
+    """
+    def __init__(self, bucket_name: str, dry_run: bool = False):
+        """
+        Constructor.
+
+        :param bucket_name: The name of S3 bucket.
+        :param dry_run: Whether nothing was actually deleted.
+        """
+        self.bucket_name = bucket_name
+        self.dry_run = dry_run
+
+        # Amount of deleted object versions and delete markers.
+        self.objects = 0
+        # Total size of deleted object versions in bytes.
+        self.bytes = 0
+        self.elapsed = 0.0
+        self.bucket_deleted = False
+        # Whether the bucket existed.
+        self.found = True
+        # Error which failed the deletion (if it failed).
+        self.error: Optional[str] = None
+
+    def __repr__(self) -> str:
+        if not self.found:
+            return f'{self.bucket_name}: not found'
+
+        return (
+            f'{self.bucket_name}: {self.objects} objects, {self.bytes} bytes, {self.elapsed:.1f}s'
+            f'{" (dry run)" if self.dry_run else ""}{f" (failed: {self.error})" if self.error else ""}'
+        )
 
 
 class S3BucketDeleter(AbstractS3Action):
     """
     Class that deletes S3 buckets.
     """
-    def __init__(self):
+    # Maximum amount of keys accepted by a single delete_objects call.
+    DELETE_BATCH_SIZE = 1000
+
+    def __init__(
+            self,
+            region: Optional[str] = None,
+            endpoint_url: Optional[str] = None,
+            max_workers: int = 8,
+            dry_run: bool = False
+    ):
         """
         Constructor.
+
+        :param region: Region of S3 clients. Default session region is used if not specified.
+        :param endpoint_url: Custom S3 endpoint url e.g. a local stand-in for AWS.
+        :param max_workers: Maximum amount of buckets processed concurrently.
+        :param dry_run: If True, objects are only counted and nothing is deleted.
         """
-        super().__init__()
+        super().__init__(region, endpoint_url)
+
+        self.max_workers = max_workers
+        self.dry_run = dry_run
 
-    def delete_with_prefix(self, prefix: str) -> None:
+    def delete_with_prefix(self, prefix: str, raise_on_error: bool = True) -> Dict[str, S3BucketDeletionResult]:
         """
-        Deletes buckets with specific prefixes.
+        Deletes buckets with specific prefixes. A failure of one bucket does not stop other
+        buckets from being deleted. It is recorded in the result of that bucket.
 
         :param prefix: Prefix for bucket names.
+        :param raise_on_error: Whether an error should be raised (after all buckets are processed)
+        if any bucket failed. If False, failures are only reported in the results.
+
+        :return: A map of bucket name -> deletion statistics.
+        """
+        names = [bucket['Name'] for bucket in self.s3_client.list_buckets()['Buckets'] if bucket['Name'].startswith(prefix)]
+
+        self.get_logger().info(f'Deleting {len(names)} buckets with prefix {prefix}...')
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {name: executor.submit(self.delete, name) for name in names}
+
+            results: Dict[str, S3BucketDeletionResult] = {}
+            failures: Dict[str, Exception] = {}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as ex:
+                    self.get_logger().error(f'Failed to delete bucket {name}: {repr(ex)}.')
+                    failures[name] = ex
+
+                    results[name] = S3BucketDeletionResult(name, self.dry_run)
+                    results[name].error = repr(ex)
+
+        if failures and raise_on_error:
+            name, error = next(iter(failures.items()))
+            raise RuntimeError(
+                f'Failed to delete {len(failures)} of {len(names)} buckets with prefix {prefix}. '
+                f'First error ({name}): {repr(error)}.'
+            ) from error
+
+        return results
+
+    def delete(self, bucket_name: str) -> S3BucketDeletionResult:
+        """
+        Deletes all objects of a bucket and the bucket itself. Missing buckets are ignored.
+
+        :param bucket_name: The name of S3 bucket.
+
+        :return: Deletion statistics.
+        """
+        result = self.empty(bucket_name)
+
+        if self.dry_run or not result.found:
+            return result
+
+        try:
+            self.s3_client.delete_bucket(Bucket=bucket_name)
+        except ClientError as ex:
+            if ex.response['Error']['Code'] != 'NoSuchBucket':
+                raise
+
+            # Deleted by someone else meanwhile.
+            result.found = False
+        else:
+            result.bucket_deleted = True
+
+        S3BucketCreator.forget(bucket_name, self.endpoint_url)
+
+        return result
+
+    def empty(self, bucket_name: str) -> S3BucketDeletionResult:
+        """
+        Deletes all objects (including object versions and delete markers) from a bucket
+        without deleting the bucket itself. Listing pages are processed as they arrive and
+        objects are deleted in batches. Missing buckets are ignored.
+
+        :param bucket_name: The name of S3 bucket.
+
+        :return: Deletion statistics.
+        """
+        self.get_logger().info(f'Emptying bucket {bucket_name}{" (dry run)" if self.dry_run else ""}...')
+
+        start = time.perf_counter()
+        result = S3BucketDeletionResult(bucket_name, self.dry_run)
+        batch: List[Dict[str, str]] = []
+
+        try:
+            for page in self.s3_client.get_paginator('list_object_versions').paginate(Bucket=bucket_name):
+                for version in page.get('Versions', []) + page.get('DeleteMarkers', []):
+                    batch.append({'Key': version['Key'], 'VersionId': version['VersionId']})
+                    result.objects += 1
+                    result.bytes += version.get('Size', 0)
+
+                    if len(batch) == self.DELETE_BATCH_SIZE:
+                        self.__delete_batch(bucket_name, batch)
+                        batch = []
+
+            if batch:
+                self.__delete_batch(bucket_name, batch)
+        except ClientError as ex:
+            if ex.response['Error']['Code'] != 'NoSuchBucket':
+                raise
+
+            self.get_logger().info(f'Bucket {bucket_name} does not exist.')
+            result.found = False
+
+        result.elapsed = time.perf_counter() - start
+        self.get_logger().info(f'Emptied {result}.')
+
+        return result
+
+    def __delete_batch(self, bucket_name: str, batch: List[Dict[str, str]]) -> None:
+        """
+        Deletes a batch of object versions with a single call.
+
+        :param bucket_name: The name of S3 bucket.
+        :param batch: Keys and version ids (at most DELETE_BATCH_SIZE).
 
         :return: No return.
         """
-        buckets = self.s3_client.list_buckets()
+        if self.dry_run:
+            return
 
-        for bucket in buckets['Buckets']:
-            name = bucket['Name']  # type: str
+        response = self.s3_client.delete_objects(Bucket=bucket_name, Delete={'Objects': batch, 'Quiet': True})
+        errors = response.get('Errors', [])
 
-            if name.startswith(prefix):
-                s3_bucket = self.s3_resource.Bucket(name)
-                s3_bucket.objects.all().delete()
-                s3_bucket.delete()
+        if errors:
+            raise ValueError(f'Failed to delete {len(errors)} objects from {bucket_name}. First error: {errors[0]}.')
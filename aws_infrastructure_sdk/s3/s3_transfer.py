@@ -0,0 +1,254 @@
+import io
+import threading
+import time
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from boto3.s3.transfer import TransferConfig
+from aws_infrastructure_sdk.client_pool import ClientPool
+
+MB = 1024 * 1024
+
+
+class TransferProfile:
+    """
+    Tunable S3 transfer parameters for multipart uploads.
+    More on multipart uploads:
+    https://docs.aws.amazon.com/AmazonS3/latest/userguide/mpuoverview.html
+    """
+    def __init__(
+            self,
+            part_size: int = 16 * MB,
+            max_concurrency: int = 10,
+            threshold: int = 16 * MB,
+            use_acceleration: bool = False
+    ) -> None:
+        """
+        Constructor.
+
+        :param part_size: Size of a single part of a multipart upload in bytes (at least 5 MB).
+        :param max_concurrency: Maximum amount of parts uploaded concurrently.
+        :param threshold: Payloads bigger than this size (in bytes) are uploaded in parts.
+        :param use_acceleration: Whether S3 transfer acceleration endpoint should be used. The bucket
+        must have transfer acceleration enabled.
+        """
+        assert part_size >= 5 * MB, 'Part size must be at least 5 MB.'
+        assert max_concurrency > 0, 'Max concurrency must be positive.'
+
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.threshold = threshold
+        self.use_acceleration = use_acceleration
+
+    def transfer_config(self) -> TransferConfig:
+        """
+        Creates boto3 transfer config.
+
+        :return: Transfer config.
+        """
+        return TransferConfig(
+            multipart_threshold=self.threshold,
+            multipart_chunksize=self.part_size,
+            max_concurrency=self.max_concurrency,
+            use_threads=self.max_concurrency > 1
+        )
+
+    def client_config(self) -> Dict[str, Any]:
+        """
+        Creates botocore config options for S3 clients used with this profile. Connection pool
+        must be at least as big as the amount of concurrently uploaded parts. Default profile
+        results in default options, hence the shared S3 client is reused.
+
+        :return: Botocore config options.
+        """
+        default_pool_size = ClientPool.DEFAULT_CONFIG['max_pool_connections']
+        config: Dict[str, Any] = {'max_pool_connections': max(self.max_concurrency, default_pool_size)}
+
+        if self.use_acceleration:
+            config['s3'] = {'use_accelerate_endpoint': True}
+
+        return config
+
+
+class TransferProgress:
+    """
+    Upload progress and throughput metrics of a single upload. An instance is passed as the boto3
+    transfer callback of that upload only, hence concurrent uploads with a shared client never count
+    each other's progress. Transfer threads upload whole parts, hence per-part timings are derived
+    from the progress every thread reports.
+    """
+    def __init__(
+            self,
+            key: str,
+            total: int,
+            on_progress: Optional[Callable[['TransferProgress'], None]] = None,
+            part_size: Optional[int] = None
+    ):
+        """
+        Constructor.
+
+        :param key: Key of the uploaded object.
+        :param total: Total size of the payload in bytes.
+        :param on_progress: Callback invoked with this instance every time new bytes are transferred
+        and every time a part is completed.
+        :param part_size: Size of a single part in bytes. The whole payload is a single part if not specified.
+        """
+        self.key = key
+        self.total = total
+        self.on_progress = on_progress
+        self.part_size = part_size or max(total, 1)
+
+        self.transferred = 0
+        # Upload durations of completed parts in seconds (in order of completion).
+        self.part_timings: List[float] = []
+
+        self.__start = time.perf_counter()
+        self.__end: Optional[float] = None
+        self.__lock = threading.Lock()
+        # A map of transfer thread -> (start time, transferred bytes) of the part it is uploading.
+        self.__parts: Dict[int, Tuple[float, int]] = {}
+
+    @property
+    def elapsed(self) -> float:
+        """
+        Returns seconds passed since the upload started (or the total upload time if it is finished).
+
+        :return: Elapsed seconds.
+        """
+        return (self.__end or time.perf_counter()) - self.__start
+
+    @property
+    def bytes_per_second(self) -> float:
+        """
+        Returns average upload throughput.
+
+        :return: Bytes per second.
+        """
+        elapsed = self.elapsed
+        return self.transferred / elapsed if elapsed > 0 else 0.0
+
+    def __call__(self, bytes_amount: int) -> None:
+        """
+        Boto3 transfer callback. Called from transfer threads. Retried requests report negative amounts.
+
+        :param bytes_amount: Amount of bytes transferred since the last call.
+
+        :return: No return.
+        """
+        now = time.perf_counter()
+        thread = threading.get_ident()
+
+        with self.__lock:
+            self.transferred += bytes_amount
+
+            started, sent = self.__parts.get(thread, (now, 0))
+            sent += bytes_amount
+
+            if sent >= self.part_size:
+                self.part_timings.append(now - started)
+                self.__parts.pop(thread, None)
+            else:
+                self.__parts[thread] = (started, sent)
+
+        if self.on_progress:
+            self.on_progress(self)
+
+    def finish(self) -> None:
+        """
+        Marks the upload as finished. The last (smaller) part is completed.
+
+        :return: No return.
+        """
+        self.__end = time.perf_counter()
+
+        with self.__lock:
+            for started, sent in self.__parts.values():
+                if sent > 0:
+                    self.part_timings.append(self.__end - started)
+
+            self.__parts.clear()
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.key}: {self.transferred}/{self.total} bytes in {self.elapsed:.1f}s '
+            f'({self.bytes_per_second / MB:.2f} MB/s, {len(self.part_timings)} parts)'
+        )
+
+
+class MemoryViewReader(io.RawIOBase):
+    """
+    Read-only, seekable file-like object over a memoryview. Lets boto3 upload a payload
+    part by part without copying the whole payload into an intermediate buffer. It is a
+    regular io object (e.g. it can be closed), since boto3 closes uploaded file objects.
+    """
+    def __init__(self, view: memoryview):
+        """
+        Constructor.
+
+        :param view: Memory view of the payload.
+        """
+        super().__init__()
+
+        self.view = view.cast('B') if view.format != 'B' or view.ndim != 1 else view
+        self.position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Reads at most "size" bytes. Only the requested chunk is copied.
+
+        :param size: Amount of bytes to read. Reads until the end if negative.
+
+        :return: Read bytes.
+        """
+        end = len(self.view) if size is None or size < 0 else min(len(self.view), self.position + size)
+        chunk = self.view[self.position:end].tobytes()
+        self.position = end
+        return chunk
+
+    def readinto(self, buffer: Any) -> int:
+        """
+        Reads bytes into a pre-allocated buffer.
+
+        :param buffer: Writable buffer.
+
+        :return: Amount of read bytes.
+        """
+        chunk = self.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        """
+        Changes the read position.
+
+        :param offset: Position offset.
+        :param whence: 0 - from the start, 1 - from the current position, 2 - from the end.
+
+        :return: New position.
+        """
+        if whence == 0:
+            self.position = offset
+        elif whence == 1:
+            self.position += offset
+        else:
+            self.position = len(self.view) + offset
+
+        self.position = max(0, min(self.position, len(self.view)))
+        return self.position
+
+    def tell(self) -> int:
+        """
+        :return: Current read position.
+        """
+        return self.position
+
+    def seekable(self) -> bool:
+        """
+        :return: Always True.
+        """
+        return True
+
+    def readable(self) -> bool:
+        """
+        :return: Always True.
+        """
+        return True
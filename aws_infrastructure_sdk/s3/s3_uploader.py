@@ -1,29 +1,147 @@
 import datetime
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
 import ntpath
+import os
+import time
 
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from botocore.exceptions import ClientError
+from aws_infrastructure_sdk.client_pool import ClientPool
 from aws_infrastructure_sdk.s3.s3_abstract_action import AbstractS3Action
+from aws_infrastructure_sdk.s3.s3_transfer import MemoryViewReader, TransferProfile, TransferProgress
+
+
+class S3SyncResult:
+    """
+    Statistics of a single directory sync.
+    """
+    def __init__(self, bucket_name: str, prefix: str):
+        """
+        Constructor.
+
+        :param bucket_name: The name of S3 bucket.
+        :param prefix: Key prefix the directory was synced to.
+        """
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+
+        self.uploaded: List[str] = []
+        self.skipped: List[str] = []
+        self.deleted: List[str] = []
+
+        # Bytes actually sent (after compression).
+        self.bytes_uploaded = 0
+        # Bytes that were not sent because objects were up to date.
+        self.bytes_skipped = 0
+        self.elapsed = 0.0
+
+    @property
+    def bytes_total(self) -> int:
+        """
+        Returns the amount of bytes a full upload of the directory would send.
+
+        :return: Bytes.
+        """
+        return self.bytes_uploaded + self.bytes_skipped
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.bucket_name}/{self.prefix}: {len(self.uploaded)} uploaded, {len(self.skipped)} skipped, '
+            f'{len(self.deleted)} deleted, {self.bytes_uploaded}/{self.bytes_total} bytes sent '
+            f'({self.bytes_skipped} skipped) in {self.elapsed:.1f}s'
+        )
 
 
 class S3Uploader(AbstractS3Action):
-    def __init__(self, bucket_name: str):
-        super().__init__()
+    # Chunk size in bytes used when hashing files.
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    # Maximum amount of keys accepted by a single delete_objects call.
+    DELETE_BATCH_SIZE = 1000
+
+    # Name of the object (under a synced prefix) which holds the manifest of synced objects.
+    SYNC_MANIFEST_NAME = '.s3-sync-manifest.json'
+
+    # Content encodings supported by sync_directory.
+    GZIP = 'gzip'
+    BROTLI = 'br'
+
+    # Files with these extensions are pre-compressed by sync_directory (if compression is enabled).
+    COMPRESSIBLE_EXTENSIONS = {'.html', '.htm', '.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.xml', '.csv'}
+
+    def __init__(
+            self,
+            bucket_name: str,
+            content_addressed: bool = False,
+            region: Optional[str] = None,
+            endpoint_url: Optional[str] = None,
+            transfer_profile: Optional[TransferProfile] = None,
+            on_progress: Optional[Callable[[TransferProgress], None]] = None
+    ):
+        """
+        Constructor.
+
+        :param bucket_name: The name of S3 bucket.
+        :param content_addressed: If True, objects are named by a SHA-256 hash of their content and
+        uploads of already existing objects are skipped.
+        :param region: Region where a bucket exists. Default session region is used if not specified.
+        :param endpoint_url: Custom S3 endpoint url e.g. a local stand-in for AWS.
+        :param transfer_profile: Multipart upload parameters. TransferProfile defaults (16 MB parts and
+        threshold, 10 concurrent parts) are used if not specified.
+        :param on_progress: Callback invoked with upload progress and throughput metrics.
+        """
+        super().__init__(region, endpoint_url)
         self.bucket_name = bucket_name
+        self.content_addressed = content_addressed
+        self.transfer_profile = transfer_profile or TransferProfile()
+        self.on_progress = on_progress
+
+        self.s3_client = ClientPool.client(
+            's3',
+            region=region,
+            endpoint_url=endpoint_url,
+            config=self.transfer_profile.client_config()
+        )
 
-    def upload_bytes(self, bytes_object: bytes):
+        # Key and progress metrics of the last uploaded (or reused) object.
+        self.last_key: Optional[str] = None
+        self.last_progress: Optional[TransferProgress] = None
+
+    def upload_bytes(self, bytes_object: Union[bytes, bytearray, memoryview]):
         """
         Uploads bytes object to a specified bucket and returns a pre-signed url.
+        The payload is read through a memoryview, hence it is not copied into an intermediate buffer.
         """
         self.get_logger().info('Uploading bytes object to S3...')
 
-        bucket = self.s3_resource.Bucket(self.bucket_name)
+        view = memoryview(bytes_object)
+
+        if self.content_addressed:
+            s3_obj_name = hashlib.sha256(view).hexdigest()
+        else:
+            s3_obj_name = str(datetime.datetime.now())
 
-        output = BytesIO()
-        output.write(bytes_object)
-        output.seek(0)
+        self.last_key = s3_obj_name
 
-        s3_obj_name = str(datetime.datetime.now())
-        bucket.upload_fileobj(output, s3_obj_name)
+        if self.content_addressed and self.__exists(s3_obj_name):
+            self.get_logger().info(f'Object {s3_obj_name} already exists. Skipping upload.')
+        else:
+            self.__transfer(
+                s3_obj_name,
+                view.nbytes,
+                lambda progress: self.s3_client.upload_fileobj(
+                    MemoryViewReader(view),
+                    self.bucket_name,
+                    s3_obj_name,
+                    Config=self.transfer_profile.transfer_config(),
+                    Callback=progress
+                )
+            )
 
         s3_url = self.s3_client.generate_presigned_url('get_object', Params={
             'Bucket': self.bucket_name,
@@ -38,9 +156,374 @@ class S3Uploader(AbstractS3Action):
         """
         Uploads a file in a given bucket and returns a pre-signed url.
         """
-        self.s3_client.upload_file(path_to_file, self.bucket_name, ntpath.basename(path_to_file))
+        if self.content_addressed:
+            s3_obj_name = self.__file_hash(path_to_file)
+        else:
+            s3_obj_name = ntpath.basename(path_to_file)
+
+        self.last_key = s3_obj_name
+
+        if self.content_addressed and self.__exists(s3_obj_name):
+            self.get_logger().info(f'Object {s3_obj_name} already exists. Skipping upload.')
+        else:
+            self.__transfer(
+                s3_obj_name,
+                os.path.getsize(path_to_file),
+                lambda progress: self.s3_client.upload_file(
+                    path_to_file,
+                    self.bucket_name,
+                    s3_obj_name,
+                    Config=self.transfer_profile.transfer_config(),
+                    Callback=progress
+                )
+            )
 
         return self.s3_client.generate_presigned_url(
             'get_object',
-            Params={'Bucket': self.bucket_name, 'Key': ntpath.basename(path_to_file)}
+            Params={'Bucket': self.bucket_name, 'Key': s3_obj_name}
         )
+
+    def cleanup(self, referenced_keys: Iterable[str], min_age: Optional[datetime.timedelta] = None) -> List[str]:
+        """
+        Deletes objects that are not referenced anymore, e.g. old content-addressed templates.
+
+        :param referenced_keys: Keys that must be kept.
+        :param min_age: If specified, only objects older than this age are deleted.
+
+        :return: A list of deleted keys.
+        """
+        referenced = set(referenced_keys)
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+        unreferenced: List[str] = []
+        for page in self.s3_client.get_paginator('list_objects_v2').paginate(Bucket=self.bucket_name):
+            for obj in page.get('Contents', []):
+                if obj['Key'] in referenced:
+                    continue
+
+                if min_age is not None and now - obj['LastModified'] < min_age:
+                    continue
+
+                unreferenced.append(obj['Key'])
+
+        self.__delete_keys(unreferenced)
+
+        return unreferenced
+
+    def sync_directory(
+            self,
+            directory: str,
+            prefix: str = '',
+            delete_orphans: bool = False,
+            compression: Optional[str] = None,
+            max_workers: int = 8
+    ) -> S3SyncResult:
+        """
+        Incrementally uploads a local directory tree. Remote state is read from a manifest (keys, sizes,
+        content hashes and encodings) stored next to the synced objects, hence unchanged files are
+        only hashed locally and never uploaded again. New and changed files are uploaded in parallel.
+
+        :param directory: Path to a local directory.
+        :param prefix: Key prefix under which the directory tree is stored.
+        :param delete_orphans: If True, remote objects under the prefix without a local file are deleted.
+        :param compression: Content encoding ("gzip" or "br") used to pre-compress text files. Brotli
+        requires "brotli" package to be installed.
+        :param max_workers: Maximum amount of concurrently hashed and uploaded files.
+
+        :return: Sync statistics.
+        """
+        assert os.path.isdir(directory), f'Directory {directory} does not exist.'
+        assert compression in [None, self.GZIP, self.BROTLI], f'Unsupported compression: {compression}.'
+
+        if compression == self.BROTLI:
+            self.__brotli()
+
+        start = time.perf_counter()
+        prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        result = S3SyncResult(self.bucket_name, prefix)
+        manifest_key = prefix + self.SYNC_MANIFEST_NAME
+
+        files: Dict[str, str] = {}
+        for root, _, names in os.walk(directory):
+            for name in names:
+                path = os.path.join(root, name)
+                files[prefix + os.path.relpath(path, directory).replace(os.sep, '/')] = path
+
+        files.pop(manifest_key, None)
+
+        remote = self.__remote_sizes(prefix, manifest_key)
+        manifest = self.__load_manifest(manifest_key)
+
+        # Objects changed (or deleted) outside of this method are not trusted.
+        manifest = {
+            key: entry for key, entry in manifest.items()
+            if remote.get(key) == entry['size']
+        }
+
+        self.get_logger().info(f'Syncing {len(files)} files from {directory} to {self.bucket_name}/{prefix}...')
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                key: executor.submit(self.__sync_file, key, path, manifest.get(key), compression)
+                for key, path in files.items()
+            }
+
+            synced: Dict[str, Dict[str, Any]] = {}
+            failures: Dict[str, Exception] = {}
+            for key, future in futures.items():
+                try:
+                    entry, uploaded = future.result()
+                except Exception as ex:
+                    self.get_logger().error(f'Failed to sync {key}: {repr(ex)}.')
+                    failures[key] = ex
+
+                    # A failed upload leaves the previous object (if any) in place.
+                    if key in manifest:
+                        synced[key] = manifest[key]
+
+                    continue
+
+                synced[key] = entry
+
+                if uploaded:
+                    result.uploaded.append(key)
+                    result.bytes_uploaded += entry['size']
+                else:
+                    result.skipped.append(key)
+                    result.bytes_skipped += entry['size']
+
+        if delete_orphans:
+            result.deleted = sorted(key for key in remote if key not in files)
+            self.__delete_keys(result.deleted)
+
+        if synced != manifest or result.deleted:
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=manifest_key,
+                Body=json.dumps(synced, sort_keys=True).encode(),
+                ContentType='application/json'
+            )
+
+        result.elapsed = time.perf_counter() - start
+
+        if failures:
+            # The manifest already records successful uploads, hence a retry only uploads failed files.
+            key, error = next(iter(failures.items()))
+            raise RuntimeError(
+                f'Failed to sync {len(failures)} files to {self.bucket_name}/{prefix} ({result}). '
+                f'First error ({key}): {repr(error)}.'
+            ) from error
+
+        self.get_logger().info(f'Synced {result}.')
+
+        return result
+
+    def __transfer(self, key: str, size: int, upload: Callable[[TransferProgress], None]) -> None:
+        """
+        Runs an upload while recording its progress and throughput.
+
+        :param key: Object key.
+        :param size: Payload size in bytes.
+        :param upload: Function which uploads the payload using a given progress callback.
+
+        :return: No return.
+        """
+        # Payloads below the threshold are uploaded with a single request.
+        part_size = self.transfer_profile.part_size if size >= self.transfer_profile.threshold else size
+        progress = TransferProgress(key, size, self.on_progress, part_size)
+
+        try:
+            upload(progress)
+        finally:
+            progress.finish()
+
+        self.last_progress = progress
+        self.get_logger().info(f'Uploaded {progress}.')
+
+    def __sync_file(
+            self,
+            key: str,
+            path: str,
+            remote: Optional[Dict[str, Any]],
+            compression: Optional[str]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Uploads a single file of a synced directory if it differs from its remote object.
+
+        :param key: Object key.
+        :param path: Path to a local file.
+        :param remote: Manifest entry of the remote object (if it exists).
+        :param compression: Content encoding to use for compressible files.
+
+        :return: A tuple of (manifest entry, whether the file was uploaded).
+        """
+        encoding = compression if os.path.splitext(path)[1].lower() in self.COMPRESSIBLE_EXTENSIONS else None
+        sha256 = self.__file_hash(path)
+
+        if remote and remote['sha256'] == sha256 and remote.get('encoding') == encoding:
+            return remote, False
+
+        extra_args = {
+            'ContentType': mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            'Metadata': {'sha256': sha256}
+        }
+
+        if encoding:
+            with open(path, 'rb') as file:
+                body = self.__compress(file.read(), encoding)
+
+            extra_args['ContentEncoding'] = encoding
+            size = len(body)
+
+            self.__transfer(
+                key,
+                size,
+                lambda progress: self.s3_client.upload_fileobj(
+                    MemoryViewReader(memoryview(body)),
+                    self.bucket_name,
+                    key,
+                    ExtraArgs=extra_args,
+                    Config=self.transfer_profile.transfer_config(),
+                    Callback=progress
+                )
+            )
+        else:
+            size = os.path.getsize(path)
+
+            self.__transfer(
+                key,
+                size,
+                lambda progress: self.s3_client.upload_file(
+                    path,
+                    self.bucket_name,
+                    key,
+                    ExtraArgs=extra_args,
+                    Config=self.transfer_profile.transfer_config(),
+                    Callback=progress
+                )
+            )
+
+        return {'size': size, 'sha256': sha256, 'encoding': encoding}, True
+
+    def __remote_sizes(self, prefix: str, manifest_key: str) -> Dict[str, int]:
+        """
+        Lists objects under a prefix.
+
+        :param prefix: Key prefix.
+        :param manifest_key: Key of the sync manifest which is excluded from the listing.
+
+        :return: A map of object key -> size in bytes.
+        """
+        sizes: Dict[str, int] = {}
+
+        for page in self.s3_client.get_paginator('list_objects_v2').paginate(Bucket=self.bucket_name, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                if obj['Key'] != manifest_key:
+                    sizes[obj['Key']] = obj['Size']
+
+        return sizes
+
+    def __load_manifest(self, manifest_key: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Reads a sync manifest.
+
+        :param manifest_key: Key of the sync manifest.
+
+        :return: A map of object key -> manifest entry (size, sha256, encoding). Empty if there is no manifest.
+        """
+        try:
+            body = self.s3_client.get_object(Bucket=self.bucket_name, Key=manifest_key)['Body'].read()
+        except ClientError as ex:
+            if ex.response['Error']['Code'] in ['404', 'NoSuchKey', 'NotFound']:
+                return {}
+            raise
+
+        try:
+            return json.loads(body)
+        except ValueError:
+            self.get_logger().warning(f'Manifest {manifest_key} is corrupted. Ignoring it.')
+            return {}
+
+    def __delete_keys(self, keys: List[str]) -> None:
+        """
+        Deletes objects in batches.
+
+        :param keys: Object keys.
+
+        :return: No return.
+        """
+        self.get_logger().info(f'Deleting {len(keys)} objects from {self.bucket_name}...')
+
+        for i in range(0, len(keys), self.DELETE_BATCH_SIZE):
+            self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={
+                    'Objects': [{'Key': key} for key in keys[i:i + self.DELETE_BATCH_SIZE]],
+                    'Quiet': True
+                }
+            )
+
+    def __compress(self, data: bytes, encoding: str) -> bytes:
+        """
+        Compresses data deterministically, so equal files produce equal objects.
+
+        :param data: Data to compress.
+        :param encoding: Content encoding ("gzip" or "br").
+
+        :return: Compressed data.
+        """
+        if encoding == self.BROTLI:
+            return self.__brotli().compress(data)
+
+        # Gzip header holds a modification time. "gzip.compress" accepts "mtime" only since Python 3.8.
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as file:
+            file.write(data)
+
+        return buffer.getvalue()
+
+    @staticmethod
+    def __brotli() -> Any:
+        """
+        Imports brotli module which is an optional dependency.
+
+        :return: Brotli module.
+        """
+        try:
+            import brotli
+        except ImportError:
+            raise ImportError('Brotli compression requires "brotli" package. Install it with "pip install brotli".')
+
+        return brotli
+
+    def __exists(self, key: str) -> bool:
+        """
+        Checks whether an object exists in the bucket.
+
+        :param key: Object key.
+
+        :return: True if object exists, False otherwise.
+        """
+        try:
+            self.s3_client.head_object(Bucket=self.bucket_name, Key=key)
+            return True
+        except ClientError as ex:
+            if ex.response['Error']['Code'] in ['404', 'NoSuchKey', 'NotFound']:
+                return False
+            raise
+
+    def __file_hash(self, path_to_file: str) -> str:
+        """
+        Calculates SHA-256 hash of a file without loading it into memory.
+
+        :param path_to_file: Path to a file.
+
+        :return: Hex digest.
+        """
+        sha = hashlib.sha256()
+
+        with open(path_to_file, 'rb') as file:
+            for chunk in iter(lambda: file.read(self.HASH_CHUNK_SIZE), b''):
+                sha.update(chunk)
+
+        return sha.hexdigest()
@@ -0,0 +1,203 @@
+import datetime
+import fcntl
+import json
+import logging
+import time
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from aws_infrastructure_sdk.zappa.utils import observe_commands
+
+logr = logging.getLogger(__name__)
+
+
+class PhaseMetrics:
+    """
+    Resource usage of a single deployment phase.
+    """
+    def __init__(self, name: str):
+        """
+        Constructor.
+
+        :param name: Name of the phase.
+        """
+        self.name = name
+        # Whether the phase was skipped (e.g. resumed from a checkpoint).
+        self.skipped = False
+
+        # Wall time of the phase and CPU time of its subprocesses in seconds.
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        # Amount of subprocesses the phase executed.
+        self.commands = 0
+
+        self.bytes_downloaded = 0
+        self.bytes_uploaded = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        :return: Serializable representation.
+        """
+        return {
+            'skipped': self.skipped,
+            'wall_time': round(self.wall_time, 3),
+            'cpu_time': round(self.cpu_time, 3),
+            'commands': self.commands,
+            'bytes_downloaded': self.bytes_downloaded,
+            'bytes_uploaded': self.bytes_uploaded,
+        }
+
+    def __repr__(self) -> str:
+        if self.skipped:
+            return f'{self.name}: skipped'
+
+        return f'{self.name}: {self.wall_time:.1f}s (CPU {self.cpu_time:.1f}s)'
+
+
+class DeployMetrics:
+    """
+    Structured report of a single deployment: per-phase wall time, subprocess CPU time, transferred
+    bytes and package size. A report is truthy if the deployment succeeded.
+    """
+    def __init__(self, project_name: str, stage: str):
+        """
+        Constructor.
+
+        :param project_name: Name of the deployed project (with stage).
+        :param stage: Deployment stage.
+        """
+        self.project_name = project_name
+        self.stage = stage
+        self.started_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+        self.succeeded = False
+        self.error: Optional[str] = None
+        self.elapsed = 0.0
+
+        # Phases in the order they were started.
+        self.phases: Dict[str, PhaseMetrics] = {}
+        self.package_size: Optional[int] = None
+        # Additional deployment facts (commit, cache hits, etc.).
+        self.details: Dict[str, Any] = {}
+
+        self.__start = time.perf_counter()
+
+    @property
+    def timings(self) -> Dict[str, float]:
+        """
+        :return: A map of executed phase name -> wall time in seconds.
+        """
+        return {name: phase.wall_time for name, phase in self.phases.items() if not phase.skipped}
+
+    @property
+    def cpu_time(self) -> float:
+        """
+        :return: Total CPU time of all subprocesses in seconds.
+        """
+        return sum(phase.cpu_time for phase in self.phases.values())
+
+    @property
+    def bytes_downloaded(self) -> int:
+        """
+        :return: Total downloaded bytes.
+        """
+        return sum(phase.bytes_downloaded for phase in self.phases.values())
+
+    @property
+    def bytes_uploaded(self) -> int:
+        """
+        :return: Total uploaded bytes.
+        """
+        return sum(phase.bytes_uploaded for phase in self.phases.values())
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[PhaseMetrics]:
+        """
+        Measures a phase: its wall time and CPU time of all subprocesses it executes.
+
+        :param name: Name of the phase.
+
+        :return: Context manager which yields phase metrics (transferred bytes can be added to them).
+        """
+        phase = self.phases.setdefault(name, PhaseMetrics(name))
+        start = time.perf_counter()
+
+        with observe_commands() as results:
+            try:
+                yield phase
+            finally:
+                phase.wall_time += time.perf_counter() - start
+                phase.cpu_time += sum(result.cpu_time for result in results)
+                phase.commands += len(results)
+
+    def skip(self, name: str) -> None:
+        """
+        Records a skipped phase.
+
+        :param name: Name of the phase.
+
+        :return: No return.
+        """
+        self.phases.setdefault(name, PhaseMetrics(name)).skipped = True
+
+    def finish(self, error: Optional[Exception] = None) -> None:
+        """
+        Marks the deployment as finished.
+
+        :param error: Error which failed the deployment (if it failed).
+
+        :return: No return.
+        """
+        self.succeeded = error is None
+        self.error = repr(error) if error else None
+        self.elapsed = time.perf_counter() - self.__start
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        :return: Serializable representation.
+        """
+        return {
+            'project': self.project_name,
+            'stage': self.stage,
+            'started_at': self.started_at,
+            'succeeded': self.succeeded,
+            'error': self.error,
+            'elapsed': round(self.elapsed, 3),
+            'cpu_time': round(self.cpu_time, 3),
+            'bytes_downloaded': self.bytes_downloaded,
+            'bytes_uploaded': self.bytes_uploaded,
+            'package_size': self.package_size,
+            'phases': {name: phase.to_dict() for name, phase in self.phases.items()},
+            'details': self.details,
+        }
+
+    def append_to(self, metrics_file: str) -> None:
+        """
+        Appends the report as a single JSON line to a file. The file is locked while writing,
+        hence concurrent deployments can share it.
+
+        :param metrics_file: Path to a JSON lines file.
+
+        :return: No return.
+        """
+        line = json.dumps(self.to_dict(), default=str) + '\n'
+
+        with open(metrics_file, 'a') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+
+            try:
+                file.write(line)
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+        logr.info(f'Appended deployment metrics of {self.project_name} to {metrics_file}.')
+
+    def __bool__(self) -> bool:
+        return self.succeeded
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.project_name}: {"succeeded" if self.succeeded else "failed"} in {self.elapsed:.1f}s '
+            f'(CPU {self.cpu_time:.1f}s, {self.bytes_downloaded} bytes down, {self.bytes_uploaded} bytes up, '
+            f'package {self.package_size} bytes) {list(self.phases.values())}'
+        )
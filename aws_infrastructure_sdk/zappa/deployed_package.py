@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import os
+import subprocess
+
+from typing import Any, Dict, Optional
+from botocore.exceptions import ClientError
+from aws_infrastructure_sdk.client_pool import ClientPool
+
+logr = logging.getLogger(__name__)
+
+
+class DeployedPackage:
+    """
+    Describes the package of a deployed zappa lambda function. Zappa packages are not reproducible
+    (zip entries carry timestamps), hence a deterministic fingerprint of package inputs is stored in
+    function tags together with the code hash the fingerprint was deployed as.
+    More on lambda code hash:
+    https://docs.aws.amazon.com/lambda/latest/dg/API_FunctionConfiguration.html
+    """
+    FINGERPRINT_TAG = 'aws-infrastructure-sdk:fingerprint'
+    CODE_SHA256_TAG = 'aws-infrastructure-sdk:code-sha256'
+
+    # Project files and directories which do not end up in a package or change between builds.
+    EXCLUDED_NAMES = {'.git', '__pycache__', '.env', 'zappa_settings.json'}
+    EXCLUDED_EXTENSIONS = {'.pyc', '.pyo'}
+
+    # Zappa settings which do not affect a deployed function.
+    EXCLUDED_SETTINGS = {'s3_bucket'}
+
+    def __init__(self, function_name: str, region: Optional[str] = None, endpoint_url: Optional[str] = None):
+        """
+        Constructor.
+
+        :param function_name: Name of the lambda function.
+        :param region: Region of the function. Default session region is used if not specified.
+        :param endpoint_url: Custom endpoint url e.g. a local stand-in for AWS.
+        """
+        self.function_name = function_name
+        self.lambda_client = ClientPool.client('lambda', region=region, endpoint_url=endpoint_url)
+
+        self.__description: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def fingerprint(cls, project_path: str, virtualenv_path: str, stage: str) -> str:
+        """
+        Calculates a deterministic fingerprint of a package: sorted project file contents, installed
+        packages and stage settings (including the environment).
+
+        :param project_path: Path to a zappa project.
+        :param virtualenv_path: Path to a virtual environment the project is packaged with.
+        :param stage: Deployment stage.
+
+        :return: Hex digest.
+        """
+        sha = hashlib.sha256()
+        virtualenv_path = os.path.realpath(os.path.join(project_path, virtualenv_path))
+
+        files = []
+        for root, directories, names in os.walk(project_path):
+            directories[:] = [
+                directory for directory in directories
+                if directory not in cls.EXCLUDED_NAMES
+                and os.path.realpath(os.path.join(root, directory)) != virtualenv_path
+            ]
+
+            for name in names:
+                if name not in cls.EXCLUDED_NAMES and os.path.splitext(name)[1] not in cls.EXCLUDED_EXTENSIONS:
+                    files.append(os.path.join(root, name))
+
+        for path in sorted(files):
+            sha.update(os.path.relpath(path, project_path).encode())
+
+            with open(path, 'rb') as file:
+                for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                    sha.update(chunk)
+
+        sha.update(subprocess.check_output([os.path.join(virtualenv_path, 'bin', 'pip'), 'freeze', '--all']))
+
+        with open(os.path.join(project_path, 'zappa_settings.json'), 'r') as file:
+            settings = json.load(file).get(stage, {})
+
+        settings = {key: value for key, value in settings.items() if key not in cls.EXCLUDED_SETTINGS}
+        sha.update(json.dumps(settings, sort_keys=True).encode())
+
+        return sha.hexdigest()
+
+    def describe(self, refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Describes the deployed function.
+
+        :param refresh: Whether a cached description should be reloaded.
+
+        :return: Function description (as returned by get_function) or None if function does not exist.
+        """
+        if self.__description is None or refresh:
+            try:
+                self.__description = self.lambda_client.get_function(FunctionName=self.function_name)
+            except ClientError as ex:
+                if ex.response['Error']['Code'] != 'ResourceNotFoundException':
+                    raise
+
+                self.__description = {}
+
+        return self.__description or None
+
+    def matches(self, fingerprint: str) -> bool:
+        """
+        Checks whether a package with a given fingerprint is already deployed. The deployed code must be
+        exactly the code the fingerprint was recorded for, hence code changed by other means is redeployed.
+
+        :param fingerprint: Package fingerprint.
+
+        :return: True if the package is deployed.
+        """
+        description = self.describe(refresh=True)
+
+        if not description:
+            logr.info(f'Function {self.function_name} does not exist. Deploying.')
+            return False
+
+        tags = description.get('Tags', {})
+        code_sha256 = description['Configuration']['CodeSha256']
+
+        if tags.get(self.FINGERPRINT_TAG) != fingerprint:
+            logr.info(
+                f'Function {self.function_name} fingerprint {tags.get(self.FINGERPRINT_TAG)} '
+                f'differs from package fingerprint {fingerprint}. Deploying.'
+            )
+            return False
+
+        if tags.get(self.CODE_SHA256_TAG) != code_sha256:
+            logr.info(
+                f'Function {self.function_name} code {code_sha256} differs from '
+                f'code {tags.get(self.CODE_SHA256_TAG)} recorded for fingerprint {fingerprint}. Deploying.'
+            )
+            return False
+
+        logr.info(f'Function {self.function_name} already runs package {fingerprint} (code {code_sha256}).')
+        return True
+
+    def record(self, fingerprint: str) -> None:
+        """
+        Tags the deployed function with a package fingerprint and its current code hash.
+
+        :param fingerprint: Fingerprint of the deployed package.
+
+        :return: No return.
+        """
+        configuration = self.describe(refresh=True)['Configuration']
+
+        self.lambda_client.tag_resource(
+            Resource=configuration['FunctionArn'],
+            Tags={
+                self.FINGERPRINT_TAG: fingerprint,
+                self.CODE_SHA256_TAG: configuration['CodeSha256'],
+            }
+        )
+
+        logr.info(f'Recorded package {fingerprint} (code {configuration["CodeSha256"]}) of {self.function_name}.')
@@ -0,0 +1,249 @@
+import fcntl
+import hashlib
+import logging
+import os
+import shlex
+import shutil
+import time
+
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from aws_infrastructure_sdk.zappa.utils import directory_size, run_command
+
+logr = logging.getLogger(__name__)
+
+
+class GitCheckout:
+    """
+    Outcome of a single checkout from a mirror.
+    """
+    def __init__(self, commit: str):
+        """
+        Constructor.
+
+        :param commit: SHA of the checked out commit.
+        """
+        self.commit = commit
+
+        # Growth of the mirror by the fetch in bytes (an estimate of downloaded bytes).
+        self.bytes_downloaded = 0
+        # Durations of the fetch and the checkout in seconds.
+        self.timings: Dict[str, float] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.commit} (fetch: {self.timings.get("fetch", 0.0):.1f}s, {self.bytes_downloaded} bytes, '
+            f'checkout: {self.timings.get("checkout", 0.0):.1f}s)'
+        )
+
+
+class GitMirrorCache:
+    """
+    Persistent cache of bare git mirrors keyed by repository url. A mirror is cloned once and later only
+    fetched incrementally. Project checkouts are made from the local mirror with "git clone --local", which
+    hardlinks mirror objects instead of copying or downloading them. Checkouts do not depend on the mirror
+    afterwards, hence a mirror can be fetched, repacked or evicted while checkouts of it are still in use.
+    More on local clones:
+    https://git-scm.com/docs/git-clone#Documentation/git-clone.txt---local
+    """
+    DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'aws-infrastructure-sdk', 'git')
+    DEFAULT_MAX_SIZE = 5 * 1024 ** 3
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        """
+        Constructor.
+
+        :param cache_dir: Directory where mirrors are stored.
+        :param max_size: Maximum total size of mirrors in bytes. Least recently used mirrors are
+        evicted when the limit is exceeded.
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    def mirror_path(self, git_url: str) -> str:
+        """
+        Returns a path of a mirror of a given repository.
+
+        :param git_url: Repository url.
+
+        :return: Path to a bare mirror repository.
+        """
+        return os.path.join(self.cache_dir, hashlib.sha256(git_url.encode()).hexdigest()[:24] + '.git')
+
+    def checkout(
+            self,
+            git_url: str,
+            target_path: str,
+            ssh_file_path: Optional[str] = None,
+            revision: str = 'HEAD'
+    ) -> GitCheckout:
+        """
+        Updates a mirror of a repository and checks out a given revision into a target directory.
+
+        :param git_url: Repository url formatted for ssh use: e.g. git@bitbucket.org:person/repository.git
+        :param target_path: Directory to check out to. Must not exist.
+        :param ssh_file_path: Path to ssh file for git actions without a password.
+        :param revision: Branch, tag or commit to check out. Default branch is used if not specified.
+
+        :return: Checked out commit with fetch and checkout statistics.
+        """
+        mirror = self.mirror_path(git_url)
+        env = self.__env(ssh_file_path)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        with self.__lock(mirror):
+            start = time.perf_counter()
+            mirror_size = directory_size(mirror)
+
+            if os.path.isdir(mirror):
+                logr.info(f'Fetching {git_url} into mirror {mirror}...')
+                self.__git(['git', '-C', mirror, 'remote', 'update', '--prune'], env)
+            else:
+                logr.info(f'Cloning {git_url} into new mirror {mirror}...')
+                self.__git(['git', 'clone', '--mirror', git_url, mirror], env)
+
+            fetch_time = time.perf_counter() - start
+            # Git might repack the mirror while fetching, hence it can shrink.
+            bytes_downloaded = max(0, directory_size(mirror) - mirror_size)
+            start = time.perf_counter()
+
+            # Branches of a mirror are only remote branches of its clone, hence the revision is resolved in the mirror.
+            commit = self.__git(['git', '-C', mirror, 'rev-parse', '--verify', f'{revision}^{{commit}}'], env).strip()
+
+            self.__git(['git', 'clone', '--local', '--no-checkout', mirror, target_path], env)
+            self.__git(['git', '-C', target_path, 'checkout', '--detach', commit], env)
+
+            checkout = GitCheckout(commit)
+            checkout.bytes_downloaded = bytes_downloaded
+            checkout.timings = {'fetch': fetch_time, 'checkout': time.perf_counter() - start}
+
+            # Modification time of a mirror marks its last use.
+            os.utime(mirror)
+
+        logr.info(f'Checked out {git_url}@{checkout} to {target_path}.')
+
+        self.evict(keep=[mirror])
+
+        return checkout
+
+    def size(self) -> int:
+        """
+        Calculates the total size of all mirrors.
+
+        :return: Size in bytes.
+        """
+        return sum(size for _, _, size in self.__mirrors())
+
+    def evict(self, keep: Optional[List[str]] = None) -> List[str]:
+        """
+        Deletes least recently used mirrors until the cache fits into the size limit.
+
+        :param keep: Paths of mirrors which must not be deleted.
+
+        :return: Paths of deleted mirrors.
+        """
+        keep = keep or []
+        mirrors = sorted(self.__mirrors(), key=lambda mirror: mirror[1])
+        total = sum(size for _, _, size in mirrors)
+
+        evicted: List[str] = []
+        for path, _, size in mirrors:
+            if total <= self.max_size:
+                break
+
+            if path in keep:
+                continue
+
+            with self.__lock(path):
+                logr.info(f'Evicting git mirror {path} ({size} bytes)...')
+                shutil.rmtree(path, ignore_errors=True)
+
+                # Processes waiting for the lock notice it is gone and lock a new file.
+                os.remove(path + '.lock')
+
+            evicted.append(path)
+            total -= size
+
+        return evicted
+
+    def __mirrors(self) -> List[Tuple[str, float, int]]:
+        """
+        Lists cached mirrors.
+
+        :return: A list of (path, last use time, size in bytes) tuples.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return []
+
+        mirrors: List[Tuple[str, float, int]] = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+
+            if name.endswith('.git') and os.path.isdir(path):
+                mirrors.append((path, os.path.getmtime(path), directory_size(path)))
+
+        return mirrors
+
+    @staticmethod
+    @contextmanager
+    def __lock(mirror: str) -> Iterator[None]:
+        """
+        Holds an exclusive (inter-process) lock of a mirror, so concurrent deploys of the same
+        repository do not fetch into the same mirror at once. Lock files are deleted together with
+        evicted mirrors, hence a lock is retried if its file was deleted while waiting for it.
+
+        :param mirror: Path to a mirror.
+
+        :return: Context manager.
+        """
+        while True:
+            with open(mirror + '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+                try:
+                    try:
+                        current = os.stat(lock_file.name)
+                    except FileNotFoundError:
+                        continue
+
+                    if not os.path.samestat(os.fstat(lock_file.fileno()), current):
+                        continue
+
+                    yield
+                    return
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def __env(ssh_file_path: Optional[str]) -> Dict[str, str]:
+        """
+        Creates environment for git commands.
+
+        :param ssh_file_path: Path to ssh file for git actions without a password.
+
+        :return: Environment variables.
+        """
+        env = dict(os.environ)
+
+        if ssh_file_path:
+            env['GIT_SSH_COMMAND'] = f'ssh -i {shlex.quote(ssh_file_path)} -o IdentitiesOnly=yes'
+
+        return env
+
+    @staticmethod
+    def __git(command: List[str], env: Dict[str, str]) -> str:
+        """
+        Runs a git command. Commands run through run_command, hence their resource usage is reported.
+
+        :param command: Command arguments.
+        :param env: Environment variables.
+
+        :return: Standard output of the command (warnings on standard error are only logged).
+        """
+        result = run_command(' '.join(shlex.quote(argument) for argument in command), env=env, capture_stdout=True)
+
+        if not result.ok:
+            raise RuntimeError(f'Git command failed: {" ".join(command)}.')
+
+        return result.stdout
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from typing import Any, Dict, Optional
+
+logr = logging.getLogger(__name__)
+
+
+class TestResultCache:
+    """
+    Persistent record of passed test suites. A pass is keyed by a commit, a dependency hash and an
+    environment hash, hence the same code tested against the same dependencies and environment does
+    not have to be tested again (e.g. when a deployment is retried or the same commit is redeployed).
+    Dependencies and environments are specific to a stage, hence a pass is never reused by another stage.
+    """
+    DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'aws-infrastructure-sdk', 'tests')
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR) -> None:
+        """
+        Constructor.
+
+        :param cache_dir: Directory where passes are recorded.
+        """
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def key(commit: str, dependency_hash: str, environment_hash: str) -> str:
+        """
+        Creates a key of a test run.
+
+        :param commit: SHA of the tested commit.
+        :param dependency_hash: Hash of installed dependencies.
+        :param environment_hash: Hash of the environment tests run with.
+
+        :return: Hex digest.
+        """
+        return hashlib.sha256(f'{commit}:{dependency_hash}:{environment_hash}'.encode()).hexdigest()
+
+    @staticmethod
+    def environment_hash(environment: Dict[str, Any]) -> str:
+        """
+        Creates a hash of environment variables.
+
+        :param environment: Environment variables.
+
+        :return: Hex digest.
+        """
+        return hashlib.sha256(json.dumps(environment, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Finds a recorded pass.
+
+        :param key: Key of a test run.
+
+        :return: Recorded pass or None if tests never passed with this key.
+        """
+        try:
+            with open(self.__path(key), 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logr.warning(f'Test result {key} is corrupted. Ignoring it.')
+            return None
+
+    def record(self, key: str, record: Dict[str, Any]) -> None:
+        """
+        Records a passed test run. The record is written atomically, so concurrent readers never see
+        a partial record.
+
+        :param key: Key of a test run.
+        :param record: Details of the passed run (commit, hashes, duration, etc.).
+
+        :return: No return.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(record, file, sort_keys=True)
+
+        os.replace(temporary_path, self.__path(key))
+
+    def __path(self, key: str) -> str:
+        """
+        Returns a path of a record.
+
+        :param key: Key of a test run.
+
+        :return: Path to a record file.
+        """
+        return os.path.join(self.cache_dir, key + '.json')
@@ -1,30 +1,217 @@
 import logging
+import os
+import signal
 import subprocess
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
 
 logr = logging.getLogger(__name__)
 
+# Per-thread stack of lists which collect results of executed commands.
+_observers = threading.local()
+
 
-def run_bash(command: str) -> bool:
+class CommandResult:
     """
-    Execute the command in bash shell.
+    Outcome and resource usage of a single shell command.
+    """
+    def __init__(self, command: str):
+        """
+        Constructor.
 
-    :return: Boolean value indicating whether command executed successfully.
+        :param command: Executed command.
+        """
+        self.command = command
+        self.returncode: Optional[int] = None
+        self.timed_out = False
+
+        # Last lines of the combined stdout and stderr (only stderr if stdout is captured).
+        self.tail: List[str] = []
+        # Complete standard output of a command executed with capture_stdout.
+        self.stdout: Optional[str] = None
+        # Wall time and CPU time (user + system of the command and its children) in seconds.
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """
+        Indicates whether the command succeeded.
+
+        :return: True if command exited with 0 in time.
+        """
+        return self.returncode == 0 and not self.timed_out
+
+    def __repr__(self) -> str:
+        return (
+            f'Command exited with {self.returncode}{" (timed out)" if self.timed_out else ""} '
+            f'in {self.wall_time:.1f}s (CPU {self.cpu_time:.1f}s)'
+        )
+
+
+@contextmanager
+def observe_commands() -> Iterator[List[CommandResult]]:
+    """
+    Collects results of all commands executed by the current thread (including commands executed
+    with run_parallel) while the context is active. Contexts can be nested.
+
+    :return: Context manager which yields a list of command results.
+    """
+    stack = getattr(_observers, 'stack', None)
+    if stack is None:
+        stack = _observers.stack = []
+
+    results: List[CommandResult] = []
+    stack.append(results)
+
+    try:
+        yield results
+    finally:
+        stack.remove(results)
+
+
+def _report(result: CommandResult) -> None:
+    """
+    Passes a command result to all active observers of the current thread.
+
+    :param result: Command result.
+
+    :return: No return.
     """
+    for results in getattr(_observers, 'stack', []):
+        results.append(result)
+
+
+def run_command(
+        command: str,
+        timeout: Optional[float] = None,
+        tail_lines: int = 100,
+        env: Optional[Dict[str, str]] = None,
+        stdin: Optional[bytes] = None,
+        report: bool = True,
+        capture_stdout: bool = False
+) -> CommandResult:
+    """
+    Executes the command in bash shell. Output is streamed to the logger line by line and only
+    a bounded tail of it is kept in memory.
+
+    :param command: Command to execute.
+    :param timeout: Maximum duration in seconds. The command (with all of its children) is killed afterwards.
+    :param tail_lines: Amount of last output lines kept for error reports.
+    :param env: Environment variables. Current environment is used if not specified.
+    :param stdin: Input written to the command.
+    :param report: Whether the result should be passed to observers of the current thread.
+    :param capture_stdout: Whether standard output should be kept separately in the result (e.g. to parse it)
+    instead of being streamed. Standard error is streamed either way.
+
+    :return: Command result.
+    """
+    result = CommandResult(command)
+    tail = deque(maxlen=tail_lines)
+    start = time.perf_counter()
+
     process = subprocess.Popen(
         command,
         shell=True,
-        stdin=subprocess.PIPE,
+        executable='/bin/bash',
+        env=env,
+        stdin=subprocess.PIPE if stdin is not None else subprocess.DEVNULL,
         stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
+        stderr=subprocess.PIPE if capture_stdout else subprocess.STDOUT,
+        # A separate process group lets a timeout kill the whole command tree.
+        start_new_session=True
     )
 
-    output, err = process.communicate()
+    def kill() -> None:
+        result.timed_out = True
+        logr.error(f'[{process.pid}] Command timed out after {timeout}s. Killing...')
+
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
 
-    if process.returncode != 0:
-        logr.info(output.decode())
-        logr.error(err.decode())
+    def stream(pipe) -> None:
+        for raw_line in iter(pipe.readline, b''):
+            line = raw_line.decode(errors='replace').rstrip()
+            tail.append(line)
+            logr.info(f'[{process.pid}] {line}')
 
-    return process.returncode == 0
+        pipe.close()
+
+    timer = threading.Timer(timeout, kill) if timeout else None
+
+    if timer:
+        timer.start()
+
+    try:
+        if stdin is not None:
+            process.stdin.write(stdin)
+            process.stdin.close()
+
+        if capture_stdout:
+            # Both pipes are read at once, so neither of them fills up and blocks the command.
+            stderr_reader = threading.Thread(target=stream, args=(process.stderr,))
+            stderr_reader.start()
+            result.stdout = process.stdout.read().decode(errors='replace')
+            process.stdout.close()
+            stderr_reader.join()
+        else:
+            stream(process.stdout)
+
+        # Waiting with wait4 gives resource usage of the command and its waited children.
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    finally:
+        if timer:
+            timer.cancel()
+
+    result.returncode = process.returncode
+    result.tail = list(tail)
+    result.wall_time = time.perf_counter() - start
+    result.cpu_time = usage.ru_utime + usage.ru_stime
+
+    if not result.ok:
+        logr.error(f'[{process.pid}] {result}. Last output:\n' + '\n'.join(result.tail))
+
+    if report:
+        _report(result)
+
+    return result
+
+
+def run_parallel(commands: List[str], max_workers: int = 4, timeout: Optional[float] = None) -> List[CommandResult]:
+    """
+    Executes independent commands concurrently.
+
+    :param commands: Commands to execute.
+    :param max_workers: Maximum amount of concurrently running commands.
+    :param timeout: Maximum duration of every command in seconds.
+
+    :return: Command results in the same order as commands.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda command: run_command(command, timeout, report=False), commands))
+
+    # Commands ran in pool threads, hence they are reported to observers of the calling thread.
+    for result in results:
+        _report(result)
+
+    return results
+
+
+def run_bash(command: str, timeout: Optional[float] = None) -> bool:
+    """
+    Execute the command in bash shell.
+
+    :return: Boolean value indicating whether command executed successfully.
+    """
+    return run_command(command, timeout).ok
 
 
 def git_clone(git_url: str, download_path: str, path_to_git_ssh_file: str) -> None:
@@ -36,15 +223,28 @@ def git_clone(git_url: str, download_path: str, path_to_git_ssh_file: str) -> No
 
     :return: No return.
     """
-    prcs = subprocess.Popen("bash", shell=True, stdin=subprocess.PIPE, stdout=None, stderr=subprocess.PIPE)
-    stdout, stderr = prcs.communicate("ssh-agent $(ssh-add {}; git clone {} {})".format(
+    run_command("bash", stdin="ssh-agent $(ssh-add {}; git clone {} {})".format(
         path_to_git_ssh_file,
         git_url,
         download_path
     ).encode())
 
-    if stdout:
-        logr.info(stdout)
 
-    if stderr:
-        logr.error(stderr)
+def directory_size(path: str) -> int:
+    """
+    Calculates the size of a directory tree.
+
+    :param path: Path to a directory.
+
+    :return: Size in bytes (0 if the directory does not exist).
+    """
+    total = 0
+
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+
+    return total
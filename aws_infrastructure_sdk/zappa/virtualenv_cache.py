@@ -0,0 +1,264 @@
+import fcntl
+import glob
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import time
+
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+from aws_infrastructure_sdk.zappa.utils import directory_size
+from aws_infrastructure_sdk.zappa.zappa_config import ZappaConfig
+
+logr = logging.getLogger(__name__)
+
+
+class CachedVirtualenv:
+    """
+    A virtual environment provided by the cache.
+    """
+    def __init__(self, path: str):
+        """
+        Constructor.
+
+        :param path: Path to the virtual environment.
+        """
+        self.path = path
+
+        # Whether the environment was found in the cache (instead of being built).
+        self.hit = False
+        # Growth of the pip cache by the build in bytes (an estimate of downloaded packages).
+        self.bytes_downloaded = 0
+        # Time it took to get the environment in seconds.
+        self.elapsed = 0.0
+
+    def __repr__(self) -> str:
+        return f'{self.path} (cached: {self.hit}, {self.bytes_downloaded} bytes, {self.elapsed:.1f}s)'
+
+
+class VirtualenvCache:
+    """
+    Cache of built virtual environments keyed by a hash of project dependencies. Virtual environments
+    are not relocatable (absolute paths are written into scripts), hence they are built and used in place
+    inside the cache directory. A persistent pip cache (a wheelhouse of downloaded and locally built
+    wheels) is shared by all builds, so even a rebuild does not compile the same packages again.
+
+    An environment is held with a shared lock while it is in use, hence it is never evicted under
+    a running deployment. A cached environment is reused without running the build again, hence
+    builds (e.g. install.sh scripts) must only install into the virtual environment: changes they
+    make anywhere else (e.g. in the project directory) are not repeated on a cache hit.
+    """
+    DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'aws-infrastructure-sdk', 'virtualenvs')
+
+    # Project files (relative glob patterns) which define project dependencies.
+    DEFAULT_DEPENDENCY_PATTERNS = ['install.sh', 'requirements*.txt', 'requirements/**/*.txt']
+
+    # Marker file which is written into a virtual environment after it was successfully built.
+    COMPLETE_MARKER = '.complete'
+
+    def __init__(
+            self,
+            cache_dir: str = DEFAULT_CACHE_DIR,
+            max_environments: int = 5,
+            python: str = 'python3',
+            dependency_patterns: Optional[List[str]] = None
+    ) -> None:
+        """
+        Constructor.
+
+        :param cache_dir: Directory where virtual environments and wheels are stored.
+        :param max_environments: Maximum amount of cached virtual environments. Least recently used
+        environments are evicted when the limit is exceeded.
+        :param python: Python interpreter virtual environments are created with.
+        :param dependency_patterns: Project files (relative glob patterns) which define dependencies.
+        """
+        assert max_environments > 0, 'At least one environment must be cached.'
+
+        self.cache_dir = cache_dir
+        self.max_environments = max_environments
+        self.python = python
+        self.dependency_patterns = dependency_patterns or self.DEFAULT_DEPENDENCY_PATTERNS
+
+        self.environments_dir = os.path.join(cache_dir, 'envs')
+        self.wheel_dir = os.path.join(cache_dir, 'wheels')
+
+    def dependency_hash(self, project_path: str, stage: str) -> str:
+        """
+        Calculates a hash of project dependencies: dependency files, python version, zappa version and stage
+        (which is passed to the install script).
+
+        :param project_path: Path to a project.
+        :param stage: Deployment stage.
+
+        :return: Hex digest.
+        """
+        sha = hashlib.sha256()
+
+        files = set()
+        for pattern in self.dependency_patterns:
+            files.update(glob.glob(os.path.join(project_path, pattern), recursive=True))
+
+        for path in sorted(files):
+            if not os.path.isfile(path):
+                continue
+
+            sha.update(os.path.relpath(path, project_path).encode())
+
+            with open(path, 'rb') as file:
+                sha.update(hashlib.sha256(file.read()).digest())
+
+        sha.update(self.__python_version().encode())
+        sha.update(ZappaConfig.VERSION.encode())
+        sha.update(stage.encode())
+
+        return sha.hexdigest()
+
+    def environment_path(self, key: str) -> str:
+        """
+        Returns a path of a virtual environment.
+
+        :param key: Dependency hash.
+
+        :return: Path to a virtual environment.
+        """
+        return os.path.join(self.environments_dir, key[:32])
+
+    @contextmanager
+    def get(self, key: str, build: Callable[[str], None]) -> Iterator[CachedVirtualenv]:
+        """
+        Provides a virtual environment for a given dependency hash. Builds it if it is not cached.
+        The environment is held (it can not be evicted) until the context exits.
+
+        :param key: Dependency hash.
+        :param build: Function which builds a virtual environment at a given path. Must raise on failure.
+
+        :return: Context manager which yields the virtual environment with its build statistics.
+        """
+        start = time.perf_counter()
+        path = self.environment_path(key)
+        environment = CachedVirtualenv(path)
+        marker = os.path.join(path, self.COMPLETE_MARKER)
+
+        os.makedirs(self.environments_dir, exist_ok=True)
+        os.makedirs(self.wheel_dir, exist_ok=True)
+
+        with open(path + '.lock', 'w') as lock_file:
+            try:
+                while True:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+                    environment.hit = os.path.isfile(marker)
+
+                    if environment.hit:
+                        logr.info(f'Reusing cached virtual environment {path}.')
+                    else:
+                        # Leftovers of an interrupted build.
+                        shutil.rmtree(path, ignore_errors=True)
+
+                        logr.info(f'Building virtual environment {path}...')
+                        wheel_dir_size = directory_size(self.wheel_dir)
+                        build(path)
+                        environment.bytes_downloaded += max(0, directory_size(self.wheel_dir) - wheel_dir_size)
+
+                        with open(marker, 'w') as file:
+                            file.write(key)
+
+                    # Modification time of a marker marks the last use of an environment.
+                    os.utime(marker)
+
+                    # Lock conversion is not atomic, hence the environment might be evicted in between.
+                    fcntl.flock(lock_file, fcntl.LOCK_SH)
+
+                    if os.path.isfile(marker):
+                        break
+
+                environment.elapsed = time.perf_counter() - start
+                logr.info(f'Virtual environment ready: {environment}.')
+
+                self.evict(keep=[path])
+
+                yield environment
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def use(self, key: str) -> Iterator[Optional[str]]:
+        """
+        Holds an already cached virtual environment (it can not be evicted) until the context exits.
+
+        :param key: Dependency hash.
+
+        :return: Context manager which yields a path to a virtual environment or None if it is not cached.
+        """
+        path = self.environment_path(key)
+        marker = os.path.join(path, self.COMPLETE_MARKER)
+
+        if not os.path.isdir(path):
+            yield None
+            return
+
+        with open(path + '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+
+            # An environment which is not held must not stay locked, so it can be rebuilt.
+            if not os.path.isfile(marker):
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                yield None
+                return
+
+            try:
+                os.utime(marker)
+                yield path
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def evict(self, keep: Optional[List[str]] = None) -> List[str]:
+        """
+        Deletes least recently used virtual environments until the amount of them fits into the limit.
+        Environments which are being built or used are not deleted.
+
+        :param keep: Paths of environments which must not be deleted.
+
+        :return: Paths of deleted environments.
+        """
+        keep = keep or []
+
+        if not os.path.isdir(self.environments_dir):
+            return []
+
+        environments = []
+        for name in os.listdir(self.environments_dir):
+            marker = os.path.join(self.environments_dir, name, self.COMPLETE_MARKER)
+
+            if os.path.isfile(marker):
+                environments.append((os.path.getmtime(marker), os.path.join(self.environments_dir, name)))
+
+        evicted: List[str] = []
+        for _, path in sorted(environments)[:max(0, len(environments) - self.max_environments)]:
+            if path in keep:
+                continue
+
+            with open(path + '.lock', 'w') as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue
+
+                try:
+                    logr.info(f'Evicting virtual environment {path}...')
+                    shutil.rmtree(path, ignore_errors=True)
+                    evicted.append(path)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        return evicted
+
+    def __python_version(self) -> str:
+        """
+        Resolves the full version of the python interpreter.
+
+        :return: Version string.
+        """
+        return subprocess.check_output([self.python, '-c', 'import sys; print(sys.version)']).decode().strip()
@@ -0,0 +1,81 @@
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from aws_infrastructure_sdk.zappa.zappa_deploy_result import ZappaDeployResult
+from aws_infrastructure_sdk.zappa.zappa_django_deploy import ZappaDjangoDeploy
+
+logr = logging.getLogger(__name__)
+
+
+class ZappaBatchDeployer:
+    """
+    Deploys many zappa - django projects (or many stages of the same project) concurrently.
+    Deployments mostly wait for subprocesses and AWS, hence a thread pool is enough.
+    """
+    def __init__(self, deploys: List[ZappaDjangoDeploy], max_workers: int = 4, resume: bool = False) -> None:
+        """
+        Constructor.
+
+        :param deploys: Deployments to run.
+        :param max_workers: Maximum amount of concurrently running deployments.
+        :param resume: Whether previously failed deployments should be continued from their checkpoints.
+        """
+        names = [deploy.deployed_project_name_with_stage for deploy in deploys]
+        assert len(set(names)) == len(names), 'Every deployed project and stage must be unique.'
+
+        self.deploys = deploys
+        self.max_workers = max_workers
+        self.resume = resume
+
+    def deploy(self) -> Dict[str, ZappaDeployResult]:
+        """
+        Runs all deployments. A failure of one deployment does not affect the others.
+
+        :return: A map of deployed project name (with stage) -> deployment result.
+        """
+        logr.info(f'Deploying {len(self.deploys)} projects with {self.max_workers} workers...')
+
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                deploy.deployed_project_name_with_stage: executor.submit(self.__deploy, deploy, self.resume)
+                for deploy in self.deploys
+            }
+            results = {name: future.result() for name, future in futures.items()}
+
+        failed = [name for name, result in results.items() if not result.ok]
+        logr.info(
+            f'Deployed {len(results) - len(failed)} of {len(results)} projects '
+            f'in {time.perf_counter() - start:.1f}s. Failed: {failed}.'
+        )
+
+        return results
+
+    @staticmethod
+    def __deploy(deploy: ZappaDjangoDeploy, resume: bool) -> ZappaDeployResult:
+        """
+        Runs a single deployment and captures its outcome.
+
+        :param deploy: Deployment to run.
+        :param resume: Whether a previously failed deployment should be continued.
+
+        :return: Deployment result.
+        """
+        start = time.perf_counter()
+        result = ZappaDeployResult(deploy.deployed_project_name_with_stage, ZappaDeployResult.SUCCEEDED, deploy.stage)
+
+        try:
+            deploy.deploy(resume)
+        except Exception as ex:
+            logr.exception(f'Deployment of {deploy.deployed_project_name_with_stage} failed.')
+            result.result = ZappaDeployResult.FAILED
+            result.error = repr(ex)
+
+        result.elapsed = time.perf_counter() - start
+        result.timings = dict(deploy.timings)
+        result.metrics = deploy.metrics
+
+        return result
@@ -0,0 +1,42 @@
+from typing import Dict, Optional
+from aws_infrastructure_sdk.zappa.deploy_metrics import DeployMetrics
+
+
+class ZappaDeployResult:
+    """
+    Result of a single zappa project deployment.
+    """
+    SUCCEEDED = 'SUCCEEDED'
+    FAILED = 'FAILED'
+
+    def __init__(self, project_name: str, result: str, stage: Optional[str] = None):
+        """
+        Constructor.
+
+        :param project_name: Name of the deployed project (with stage).
+        :param result: One of SUCCEEDED, FAILED.
+        :param stage: Deployment stage.
+        """
+        self.project_name = project_name
+        self.result = result
+        self.stage = stage
+
+        # Error which caused a failure.
+        self.error: Optional[str] = None
+        # Total deployment time in seconds and durations of separate phases.
+        self.elapsed = 0.0
+        self.timings: Dict[str, float] = {}
+        # Structured metrics of the deployment (phases, CPU time, transferred bytes, package size).
+        self.metrics: Optional[DeployMetrics] = None
+
+    @property
+    def ok(self) -> bool:
+        """
+        Indicates whether the project is deployed.
+
+        :return: True if deployment succeeded.
+        """
+        return self.result == self.SUCCEEDED
+
+    def __repr__(self) -> str:
+        return f'{self.project_name}: {self.result} ({self.elapsed:.1f}s)'
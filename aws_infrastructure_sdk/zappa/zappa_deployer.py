@@ -1,5 +1,16 @@
+import json
 import logging
-import subprocess
+import os
+import re
+import shutil
+import tempfile
+
+from typing import Any, Dict, Optional
+from aws_infrastructure_sdk.s3.s3_bucket_creator import S3BucketCreator
+from aws_infrastructure_sdk.s3.s3_uploader import S3Uploader
+from aws_infrastructure_sdk.zappa.deploy_metrics import DeployMetrics, PhaseMetrics
+from aws_infrastructure_sdk.zappa.deployed_package import DeployedPackage
+from aws_infrastructure_sdk.zappa.utils import CommandResult, run_command
 
 logr = logging.getLogger(__name__)
 
@@ -10,54 +21,244 @@ class ZappaDeployer:
     More on zappa tool:
     https://www.zappa.io/
     """
-    def __init__(self, project_path: str, stage: str):
+    # Maximum size of a package uploaded directly to lambda (not through S3).
+    DIRECT_UPLOAD_LIMIT = 50 * 1024 ** 2
+
+    def __init__(
+            self,
+            project_path: str,
+            stage: str,
+            virtualenv_path: str = 'tmpenv',
+            timeout: Optional[float] = None,
+            function_name: Optional[str] = None,
+            region: Optional[str] = None,
+            bucket_name: Optional[str] = None,
+            metrics_file: Optional[str] = None
+    ):
         """
         Constructor.
 
         :param project_path: Path to a zappa project.
         :param stage: Stage of the project (currently supported dev or prod).
+        :param virtualenv_path: Path (absolute or relative to the project) to a virtual environment
+        with installed project dependencies, e.g. one from VirtualenvCache.
+        :param timeout: Maximum duration of every deployment command in seconds.
+        :param function_name: Name of the deployed lambda function. Resolved the same way zappa does
+        (project name from settings or project directory name, and stage) if not specified.
+        :param region: Region of the deployed function. Default session region is used if not specified.
+        :param bucket_name: Bucket the package is uploaded to. "s3_bucket" from zappa settings is used
+        if not specified.
+        :param metrics_file: Path to a JSON lines file every deployment appends its metrics to.
         """
         assert stage in ['dev', 'prod'], 'Unsupported stage.'
 
         self.stage = stage
         self.project_path = project_path
+        self.virtualenv_path = virtualenv_path
+        self.timeout = timeout
+        self.function_name = function_name
+        self.region = region
+        self.bucket_name = bucket_name
+        self.metrics_file = metrics_file
+
+        # Outcome and resource usage of every executed command (package, update or deploy).
+        self.commands: Dict[str, CommandResult] = {}
+        # Metrics of the last deployment.
+        self.metrics: Optional[DeployMetrics] = None
+        # Size of the deployed package in bytes.
+        self.package_size: Optional[int] = None
+
+    def deploy(self, force: bool = False) -> DeployMetrics:
+        """
+        Initiate zappa deployment. Deployment is skipped if the same package is already deployed.
+        The project is packaged once and the package is deployed with "zappa update" if the function
+        exists or "zappa deploy" if it does not.
+
+        :param force: Whether the project should be deployed even if it did not change.
 
-    def deploy(self) -> bool:
+        :return: Deployment metrics (probe, package, upload and update phases). Metrics are truthy
+        if deployment was successful.
         """
-        Initiate zappa deployment.
+        self.commands = {}
+        self.package_size = None
+        self.metrics = DeployMetrics(
+            self.function_name or os.path.basename(os.path.abspath(self.project_path)),
+            self.stage
+        )
+
+        try:
+            success = self.__deploy(force)
+        except Exception as ex:
+            self.metrics.finish(ex)
+            raise
+        else:
+            failed_step = next((step for step, result in self.commands.items() if not result.ok), None)
+            self.metrics.finish(None if success else RuntimeError(f'Deployment failed at {failed_step} step.'))
+        finally:
+            if self.metrics_file:
+                self.metrics.append_to(self.metrics_file)
+
+        return self.metrics
+
+    @property
+    def timings(self) -> Dict[str, float]:
+        """
+        :return: Durations of executed deployment steps (probe, package, upload, update) in seconds.
+        """
+        return self.metrics.timings if self.metrics else {}
+
+    def __deploy(self, force: bool) -> bool:
+        """
+        Runs deployment steps and records them into current metrics.
+
+        :param force: Whether the project should be deployed even if it did not change.
 
         :return: A boolean value indicating whether deployment was successful.
         """
-        deploy_command = (
+        metrics = self.metrics
+
+        with metrics.phase('probe'):
+            settings = self.__settings()
+            function_name = self.function_name or self.__function_name(settings)
+            package = DeployedPackage(function_name, self.region or settings.get('aws_region'))
+            fingerprint = DeployedPackage.fingerprint(self.project_path, self.virtualenv_path, self.stage)
+
+            metrics.project_name = function_name
+            metrics.details['fingerprint'] = fingerprint
+
+            if force:
+                logr.info(f'Forced deployment of {function_name} (package {fingerprint}).')
+            elif package.matches(fingerprint):
+                logr.info(f'Skipping deployment of {function_name}: nothing changed.')
+                metrics.details['action'] = 'skip'
+
+                for step in ['package', 'upload', 'update']:
+                    metrics.skip(step)
+
+                return True
+
+            # Description is cached by the fingerprint check, hence the probe costs at most one call.
+            exists = package.describe() is not None
+            action = 'update' if exists else 'deploy'
+            metrics.details['action'] = action
+
+        logr.info(f'Deploying {function_name} with zappa {action}...')
+
+        package_dir = tempfile.mkdtemp(prefix='zappa-package-')
+        package_path = os.path.join(package_dir, 'package.zip')
+
+        try:
+            with metrics.phase('package'):
+                if not self.__run('package', f'zappa package {self.stage} -o {package_path}'):
+                    return False
+
+                self.package_size = metrics.package_size = os.path.getsize(package_path)
+
+            # Small updates are sent directly to lambda, hence they are not uploaded to S3 first.
+            if action == 'update' and self.package_size <= self.DIRECT_UPLOAD_LIMIT:
+                metrics.skip('upload')
+                source = package_path
+            else:
+                with metrics.phase('upload') as phase:
+                    source = self.__upload(package_path, settings, phase)
+
+            with metrics.phase('update') as phase:
+                if action == 'update' and source != package_path:
+                    # Zappa (ZappaConfig.VERSION) accepts an s3 url in "deploy --zip" only: "update --zip s3://..."
+                    # fails with a TypeError. Hence lambda code is updated from the uploaded package directly
+                    # and zappa updates the rest of the stage without packaging the project again.
+                    bucket_name, key = source[len('s3://'):].split('/', 1)
+                    package.lambda_client.update_function_code(
+                        FunctionName=function_name,
+                        S3Bucket=bucket_name,
+                        S3Key=key,
+                        Publish=True
+                    )
+                    command = f'zappa update {self.stage} --no-upload'
+                else:
+                    command = f'zappa {action} {self.stage} --zip {source}'
+
+                if not self.__run('update', command):
+                    return False
+
+                # Zappa sends the local package itself.
+                if source == package_path:
+                    phase.bytes_uploaded += self.package_size
+
+                package.record(fingerprint)
+        finally:
+            shutil.rmtree(package_dir, ignore_errors=True)
+
+        logr.info(f'Deployment successful. {metrics}.')
+
+        return True
+
+    def __run(self, step: str, zappa_command: str) -> bool:
+        """
+        Runs a zappa command inside the project's virtual environment.
+
+        :param step: Name of the deployment step.
+        :param zappa_command: Zappa command.
+
+        :return: True if command succeeded.
+        """
+        command = (
             "cd {} "
             # We activate a virtual environment because zappa uses the active python
             # environment to package the dependencies.
-            "&& . tmpenv/bin/activate "
-            # We first call zappa update because it is most likely the 
-            # project is deployed not the first time.
-            "&& ( zappa update {} || zappa deploy {} )"
-        ).format(self.project_path, self.stage, self.stage)
+            "&& . {}/bin/activate "
+            "&& {}"
+        ).format(self.project_path, self.virtualenv_path, zappa_command)
 
-        try:
-            logr.info('Deploying...')
-
-            process = subprocess.Popen(
-                deploy_command,
-                shell=True,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
-
-            output, err = process.communicate()
-
-            if process.returncode != 0:
-                logr.info(output.decode())
-                logr.error(err.decode())
-
-            assert process.returncode == 0
-            logr.info('Deployment successful.')
-            return True
-        except AssertionError as ex:
-            logr.error(repr(ex))
-            return False
+        result = run_command(command, self.timeout)
+        self.commands[step] = result
+
+        if not result.ok:
+            logr.error(f'Deployment failed at {step} step.')
+
+        return result.ok
+
+    def __upload(self, package_path: str, settings: Dict[str, Any], phase: PhaseMetrics) -> str:
+        """
+        Uploads a package to the zappa bucket.
+
+        :param package_path: Path to a package.
+        :param settings: Zappa settings of the stage.
+        :param phase: Metrics of the upload phase.
+
+        :return: Package location for zappa: an s3 url, or the local path if there is no bucket (zappa uploads it then).
+        """
+        bucket_name = self.bucket_name or settings.get('s3_bucket')
+
+        if not bucket_name:
+            return package_path
+
+        uploader = S3Uploader(bucket_name, content_addressed=True, region=self.region or settings.get('aws_region'))
+        S3BucketCreator(bucket_name, uploader.s3_client.meta.region_name).create()
+        uploader.upload_file(package_path)
+
+        # An already uploaded package (same content) is not transferred again.
+        if uploader.last_progress:
+            phase.bytes_uploaded += uploader.last_progress.transferred
+
+        return f's3://{bucket_name}/{uploader.last_key}'
+
+    def __settings(self) -> Dict[str, Any]:
+        """
+        Reads zappa settings of the stage.
+
+        :return: Stage settings.
+        """
+        with open(os.path.join(self.project_path, 'zappa_settings.json'), 'r') as file:
+            return json.load(file).get(self.stage, {})
+
+    def __function_name(self, settings: Dict[str, Any]) -> str:
+        """
+        Resolves the name of the lambda function zappa deploys the project as.
+
+        :param settings: Zappa settings of the stage.
+
+        :return: Function name.
+        """
+        project_name = settings.get('project_name') or os.path.basename(os.path.abspath(self.project_path))
+        return re.sub(r'[^a-z0-9]+', '-', f'{project_name}-{self.stage}'.lower()).strip('-')
@@ -1,23 +1,40 @@
+import fcntl
+import hashlib
+import json
 import os
+import re
 import shutil
 import logging
+import tempfile
+import datetime
+import uuid
 
-from typing import Dict, Any
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+from botocore.exceptions import ClientError
 from aws_lambda.lambda_env_updater import LambdaEnvUpdater
 from aws_infrastructure_sdk.cloud_formation.stack.api_gateway_describer import ApiGatewayDescriber
 from aws_infrastructure_sdk.s3.s3_bucket_deleter import S3BucketDeleter
-from aws_infrastructure_sdk.zappa.utils import run_bash, git_clone
+from aws_infrastructure_sdk.zappa.deploy_metrics import DeployMetrics
+from aws_infrastructure_sdk.zappa.deployed_package import DeployedPackage
+from aws_infrastructure_sdk.zappa.git_mirror_cache import GitMirrorCache
+from aws_infrastructure_sdk.zappa.test_result_cache import TestResultCache
+from aws_infrastructure_sdk.zappa.utils import run_bash, run_command
+from aws_infrastructure_sdk.zappa.virtualenv_cache import VirtualenvCache
 from aws_infrastructure_sdk.zappa.zappa_env_updater import ZappaEnvUpdater
 from aws_infrastructure_sdk.zappa.zappa_config import ZappaConfig
+from aws_infrastructure_sdk.zappa.zappa_deployer import ZappaDeployer
 
 logr = logging.getLogger(__name__)
 
 
 class ZappaDjangoDeploy:
     """
-    Zappa - Django project deployment class.
+    Zappa - Django project deployment class. Every project and stage is deployed in its own workspace
+    with its own zappa bucket, hence many deployments can run on the same machine at once.
     """
-    DEFAULT_CLONE_PATH = '/tmp/zappa-django-tmp-project'
+    # File in the workspace which holds phase checkpoints and deployment state.
+    CHECKPOINTS_FILE = 'checkpoints.json'
 
     def __init__(
             self,
@@ -27,7 +44,18 @@ class ZappaDjangoDeploy:
             stage: str,
             deployed_project_name: str,
             ssh_file_path: str,
-            aws_region: str
+            aws_region: str,
+            git_cache: Optional[GitMirrorCache] = None,
+            git_revision: str = 'HEAD',
+            virtualenv_cache: Optional[VirtualenvCache] = None,
+            workspace_root: Optional[str] = None,
+            test_cache: Optional[TestResultCache] = None,
+            test_workers: int = 1,
+            force_tests: bool = False,
+            force_deploy: bool = False,
+            single_pass: bool = False,
+            custom_domain: Optional[str] = None,
+            metrics_file: Optional[str] = None
     ) -> None:
         """
         Constructor.
@@ -39,27 +67,100 @@ class ZappaDjangoDeploy:
         :param deployed_project_name: Name of the project in AWS infrastructure when it is deployed.
         :param ssh_file_path: Path to ssh file for git clone action without a password.
         :param aws_region: Region where the AWS infrastructure is.
+        :param git_cache: Cache of git mirrors the project is checked out from. A cache in the
+        default directory is used if not specified.
+        :param git_revision: Branch, tag or commit to deploy. Default branch is used if not specified.
+        :param virtualenv_cache: Cache of virtual environments keyed by project dependencies. A cache
+        in the default directory is used if not specified.
+        :param workspace_root: Directory where deployment workspaces are created. System temporary
+        directory is used if not specified.
+        :param test_cache: Record of passed test runs. A record in the default directory is used if not specified.
+        :param test_workers: Amount of parallel test processes. Tests run in a single process by default,
+        because not every test suite is parallel-safe. Django decides (one per CPU core) if 0.
+        :param force_tests: Whether tests should run even if they already passed for the same commit,
+        dependencies and environment.
+        :param force_deploy: Whether the project should be deployed even if the same package is already deployed.
+        :param single_pass: Whether the final environment (allowed host) should be resolved before packaging,
+        so that the deployment does not need a second lambda configuration update. Requires an api gateway
+        created by a previous deployment of the stage (a redeploy) or a custom domain, otherwise the allowed
+        host is fixed after the deployment as usual.
+        :param custom_domain: Custom domain the project is served from. Used as the allowed host.
+        :param metrics_file: Path to a JSON lines file every deployment (successful or not) appends its metrics to.
         """
         assert stage in ['dev', 'prod'], 'Unsupported stage.'
 
         self.aws_region = aws_region
         self.ssh_file_path = ssh_file_path
         self.project_git_url = project_git_url
-        self.project_environment = project_environment_vars
-        self.zappa_environment = zappa_environment_vars
+        self.project_environment = dict(project_environment_vars)
+        self.zappa_environment = dict(zappa_environment_vars)
         self.stage = stage
         self.deployed_project_name = deployed_project_name
         self.deployed_project_name_with_stage = self.deployed_project_name + '-' + self.stage
+        self.git_cache = git_cache or GitMirrorCache()
+        self.git_revision = git_revision
+        self.virtualenv_cache = virtualenv_cache or VirtualenvCache()
+        self.workspace_root = workspace_root
+        self.test_cache = test_cache or TestResultCache()
+        self.test_workers = test_workers
+        self.force_tests = force_tests
+        self.force_deploy = force_deploy
+        self.single_pass = single_pass
+        self.custom_domain = custom_domain
+        self.metrics_file = metrics_file
+        self.package = DeployedPackage(self.deployed_project_name_with_stage, aws_region)
+
+        # Deployer of the current deployment (holds package, upload and update metrics).
+        self.deployer: Optional[ZappaDeployer] = None
+
+        # Hash of installed project dependencies.
+        self.dependency_hash: Optional[str] = None
+
+        # Workspace of the current deployment and the path of the project inside it.
+        self.workspace: Optional[str] = None
+        self.project_path: Optional[str] = None
+
+        # Zappa bucket of the current deployment and whether it is owned (hence deleted) by the deployment.
+        self.zappa_bucket_name: Optional[str] = None
+        self.owns_zappa_bucket = False
+
+        # Metrics of the current deployment.
+        self.metrics: Optional[DeployMetrics] = None
+
+        # Path to the virtual environment the project is installed in.
+        self.virtualenv_path: Optional[str] = None
+        # Holds the virtual environment (so it is not evicted) until the deployment ends.
+        self.__environment_hold: Optional[ExitStack] = None
+
+        # SHA of the deployed commit.
+        self.commit: Optional[str] = None
+
+        # Phases skipped by a resumed deployment.
+        self.resumed_phases: List[str] = []
 
         # We make sure in initial stage it allows all hosts.
         # Used so zappa deploy would not fail.
         self.project_environment['ALLOWED_HOST'] = '*'
+        self.base_environment = dict(self.project_environment)
 
-    def deploy(self) -> None:
+    @property
+    def timings(self) -> Dict[str, float]:
         """
-        Initiates project deployment.
+        :return: Durations of executed deployment phases in seconds.
+        """
+        return self.metrics.timings if self.metrics else {}
 
-        :return: No return.
+    def deploy(self, resume: bool = False) -> DeployMetrics:
+        """
+        Initiates project deployment. Every phase (clone, settings, install, test, deploy, configure) records
+        a checkpoint with a hash of its inputs. The workspace is deleted only after the whole deployment
+        succeeded, hence a failed deployment can be resumed.
+
+        :param resume: Whether a previous failed deployment should be continued from the first phase
+        which did not complete or whose inputs changed.
+
+        :return: Deployment metrics: wall time, subprocess CPU time and transferred bytes of every phase,
+        and the package size. Metrics are appended to the metrics file (if configured) even if deployment failed.
         """
         logr.info(
             f'Initiating project deployment. Context:'
@@ -73,33 +174,360 @@ class ZappaDjangoDeploy:
             f'\nDeployed project name with stage: {self.deployed_project_name_with_stage}.'
         )
 
-        # Clean previous failed builds.
-        self.__clean()
+        self.metrics = DeployMetrics(self.deployed_project_name_with_stage, self.stage)
+        self.resumed_phases = []
+
+        try:
+            self.__run_phases(resume)
+        except Exception as ex:
+            self.metrics.finish(ex)
+            raise
+        else:
+            self.metrics.finish()
+        finally:
+            self.metrics.details.update({
+                'commit': self.commit,
+                'resumed_phases': self.resumed_phases,
+            })
+
+            if self.metrics_file:
+                self.metrics.append_to(self.metrics_file)
+
+        logr.info(f'Deployment fully configured and successful! {self.metrics}.')
+
+        return self.metrics
+
+    def __run_phases(self, resume: bool) -> None:
+        """
+        Runs deployment phases in the workspace of the project and stage. Phases completed by a previous
+        deployment with the same inputs are skipped if the deployment is resumed.
+
+        :param resume: Whether a previous failed deployment should be continued.
+
+        :return: No return.
+        """
+        self.workspace = os.path.join(
+            self.workspace_root or tempfile.gettempdir(),
+            f'zappa-{self.deployed_project_name_with_stage}'
+        )
+        self.project_path = os.path.join(self.workspace, 'project')
+
+        with self.__workspace_lock(), ExitStack() as self.__environment_hold:
+            checkpoints = self.__load_checkpoints()
+
+            if checkpoints and resume:
+                logr.info(f'Resuming deployment of {self.deployed_project_name_with_stage}...')
+                self.__restore(checkpoints['state'])
+            else:
+                if resume:
+                    logr.info(f'Nothing to resume for {self.deployed_project_name_with_stage}. Deploying from scratch.')
+
+                # Leftovers of a previous failed deployment.
+                if checkpoints:
+                    self.__restore(checkpoints['state'])
+                    self.__clean()
+
+                os.makedirs(self.workspace, exist_ok=True)
+
+                # Zappa uploads packages to this bucket. A bucket is created unless one is configured.
+                self.owns_zappa_bucket = not self.zappa_environment.get('s3_bucket')
+                self.zappa_bucket_name = self.zappa_environment.get('s3_bucket') or self.__generate_bucket_name()
+                checkpoints = {'phases': {}, 'state': {}}
+
+            phases = {
+                'clone': self.__clone,
+                'settings': self.__update_settings,
+                'install': self.__install,
+                'test': self.__test,
+                'deploy': self.__deploy,
+                'configure': self.__configure,
+            }
+
+            input_hash = ''
+            resuming = bool(checkpoints['phases'])
+
+            for name, run_phase in phases.items():
+                input_hash = self.__input_hash(name, input_hash)
+                checkpoint = checkpoints['phases'].get(name)
+
+                if resuming and checkpoint and checkpoint['input_hash'] == input_hash and self.__is_intact(name):
+                    logr.info(
+                        f'Skipping {name} phase of {self.deployed_project_name_with_stage}: '
+                        f'completed at {checkpoint["completed_at"]} with the same inputs.'
+                    )
+                    self.resumed_phases.append(name)
+                    self.metrics.skip(name)
+                    continue
+
+                # Every phase after a changed or incomplete phase runs again.
+                resuming = False
+
+                try:
+                    with self.metrics.phase(name):
+                        run_phase()
+                except Exception:
+                    logr.error(
+                        f'Phase {name} of {self.deployed_project_name_with_stage} failed. Workspace {self.workspace} '
+                        f'is kept, the deployment can be resumed with resume=True.'
+                    )
+                    raise
+
+                checkpoints['phases'][name] = {
+                    'input_hash': input_hash,
+                    'completed_at': datetime.datetime.now(datetime.timezone.utc).isoformat()
+                }
+                checkpoints['state'] = self.__state()
+                self.__save_checkpoints(checkpoints)
+
+            # Clean build dirs only when the whole deployment succeeded.
+            with self.metrics.phase('clean'):
+                self.__clean()
+
+    def __clone(self) -> None:
+        """
+        Checks out the project into the workspace.
 
+        :return: No return.
+        """
         logr.info(f'Downloading {self.deployed_project_name_with_stage} project...')
-        git_clone(self.project_git_url, self.DEFAULT_CLONE_PATH, self.ssh_file_path)
+
+        shutil.rmtree(self.project_path, ignore_errors=True)
+        checkout = self.git_cache.checkout(
+            self.project_git_url,
+            self.project_path,
+            self.ssh_file_path,
+            self.git_revision
+        )
+        self.commit = checkout.commit
+        self.metrics.phases['clone'].bytes_downloaded += checkout.bytes_downloaded
+        self.metrics.details['git_timings'] = checkout.timings
+
+    def __update_settings(self) -> None:
+        """
+        Writes the project environment and zappa settings into zappa_settings.json.
+
+        :return: No return.
+        """
+        self.project_environment = dict(self.base_environment)
+
+        if self.single_pass:
+            self.__resolve_allowed_host()
 
         logr.info(f'Updating {self.deployed_project_name_with_stage} zappa settings...')
-        ZappaEnvUpdater(self.DEFAULT_CLONE_PATH).update(self.project_environment, self.zappa_environment)
+        ZappaEnvUpdater(self.project_path).update(
+            self.project_environment,
+            {**self.zappa_environment, 's3_bucket': self.zappa_bucket_name}
+        )
 
-        # Install all dependencies.
-        self.__install()
-        # Run tests and assert whether it can be deployed to servers.
-        self.__test()
-        # Deploy to servers.
-        self.__deploy()
-        # Clean build dirs.
-        self.__clean()
+    def __configure(self) -> None:
+        """
+        Sets the final allowed host in the lambda environment (if it is not there yet).
 
+        :return: No return.
+        """
         # Zappa deploys lambda function and creates an api gateway.
         # The gateway host must be added to django security hosts.
-        api_gateway_id = ApiGatewayDescriber(self.deployed_project_name_with_stage).describe()
+        if self.custom_domain:
+            self.project_environment['ALLOWED_HOST'] = self.custom_domain
+        else:
+            # A new api gateway might have been created after the name index was loaded.
+            api_gateway_id = ApiGatewayDescriber(self.deployed_project_name_with_stage).find()
+            assert api_gateway_id, f'Api gateway of {self.deployed_project_name_with_stage} could not be found.'
+            self.project_environment['ALLOWED_HOST'] = self.__gateway_host(api_gateway_id)
+
+        desired_environment = {key: str(value) for key, value in self.project_environment.items()}
+
+        # An environment resolved before packaging (single pass) is deployed as zappa settings.
+        if self.__packaged_environment() == desired_environment:
+            logr.info('Skipping lambda environment update: environment is packaged.')
+            return
+
+        deployed_environment = self.package.describe(refresh=True)['Configuration'].get('Environment', {})
+
+        # Every configuration update recycles warm containers, hence an up to date environment is not updated.
+        if deployed_environment.get('Variables') == desired_environment:
+            logr.info('Skipping lambda environment update: environment is up to date.')
+        else:
+            logr.info('Updating lambda environment...')
+            LambdaEnvUpdater(self.deployed_project_name_with_stage).update(self.project_environment)
+
+    def __packaged_environment(self) -> Dict[str, str]:
+        """
+        Reads project environment variables of the stage from zappa settings of the deployed package.
+
+        :return: Environment variables.
+        """
+        with open(os.path.join(self.project_path, 'zappa_settings.json'), 'r') as file:
+            environment = json.load(file).get(self.stage, {}).get('environment_variables', {})
+
+        return {key: str(value) for key, value in environment.items()}
+
+    def __input_hash(self, phase: str, previous_hash: str) -> str:
+        """
+        Calculates a hash of phase inputs. Hash of the previous phase is included, hence a change
+        of any earlier input changes hashes of all later phases.
+
+        :param phase: Name of the phase.
+        :param previous_hash: Input hash of the previous phase.
+
+        :return: Hex digest.
+        """
+        if phase == 'clone':
+            inputs = [self.project_git_url, self.git_revision]
+        elif phase == 'settings':
+            inputs = [self.commit, self.base_environment, self.zappa_environment, self.single_pass, self.custom_domain]
+        elif phase == 'install':
+            inputs = [self.virtualenv_cache.dependency_hash(self.project_path, self.stage)]
+        elif phase == 'test':
+            inputs = [self.test_workers, self.force_tests]
+        elif phase == 'deploy':
+            inputs = [self.force_deploy]
+        else:
+            inputs = []
+
+        inputs_string = json.dumps([previous_hash, phase, inputs], sort_keys=True, default=str)
+        return hashlib.sha256(inputs_string.encode()).hexdigest()
+
+    def __is_intact(self, phase: str) -> bool:
+        """
+        Checks whether outputs of a completed phase still exist.
+
+        :param phase: Name of the phase.
+
+        :return: True if phase outputs exist.
+        """
+        if phase == 'clone':
+            return os.path.isdir(self.project_path)
+
+        if phase == 'install':
+            # Cached virtual environment might have been evicted. An existing one is held, so it is not evicted later.
+            virtualenv_path = self.__environment_hold.enter_context(self.virtualenv_cache.use(self.dependency_hash))
+
+            if virtualenv_path:
+                self.virtualenv_path = virtualenv_path
+
+            return bool(virtualenv_path)
+
+        return True
+
+    def __state(self) -> Dict[str, Any]:
+        """
+        Collects deployment state which later phases depend on.
+
+        :return: Serializable state.
+        """
+        return {
+            'commit': self.commit,
+            'dependency_hash': self.dependency_hash,
+            'virtualenv_path': self.virtualenv_path,
+            'zappa_bucket_name': self.zappa_bucket_name,
+            'owns_zappa_bucket': self.owns_zappa_bucket,
+            'project_environment': self.project_environment,
+        }
+
+    def __restore(self, state: Dict[str, Any]) -> None:
+        """
+        Restores deployment state of a previous deployment.
+
+        :param state: State collected by __state.
+
+        :return: No return.
+        """
+        self.commit = state['commit']
+        self.dependency_hash = state['dependency_hash']
+        self.virtualenv_path = state['virtualenv_path']
+        self.zappa_bucket_name = state['zappa_bucket_name']
+        self.owns_zappa_bucket = state['owns_zappa_bucket']
+        self.project_environment = state['project_environment']
+
+    def __load_checkpoints(self) -> Dict[str, Any]:
+        """
+        Reads checkpoints of a previous deployment.
 
-        logr.info('Updating lambda environment...')
-        self.project_environment['ALLOWED_HOST'] = '{}.execute-api.{}.amazonaws.com'.format(api_gateway_id, self.aws_region)
-        LambdaEnvUpdater(self.deployed_project_name_with_stage).update(self.project_environment)
+        :return: Checkpoints or an empty dict if there are none.
+        """
+        try:
+            with open(os.path.join(self.workspace, self.CHECKPOINTS_FILE), 'r') as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def __save_checkpoints(self, checkpoints: Dict[str, Any]) -> None:
+        """
+        Writes checkpoints atomically.
+
+        :param checkpoints: Checkpoints.
+
+        :return: No return.
+        """
+        path = os.path.join(self.workspace, self.CHECKPOINTS_FILE)
+
+        with open(path + '.tmp', 'w') as file:
+            json.dump(checkpoints, file, sort_keys=True)
+
+        os.replace(path + '.tmp', path)
+
+    @contextmanager
+    def __workspace_lock(self) -> Iterator[None]:
+        """
+        Holds an exclusive (inter-process) lock of the workspace, so the same project and stage is
+        not deployed twice at once.
+
+        :return: Context manager.
+        """
+        with open(self.workspace + '.lock', 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                raise RuntimeError(f'{self.deployed_project_name_with_stage} is already being deployed.')
+
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def __resolve_allowed_host(self) -> None:
+        """
+        Resolves the final allowed host before the project is packaged, so the deployed environment
+        is final and the lambda configuration does not have to be updated after the deployment.
+
+        :return: No return.
+        """
+        if self.custom_domain:
+            allowed_host = self.custom_domain
+        else:
+            api_gateway_id = ApiGatewayDescriber(self.deployed_project_name_with_stage).find()
+
+            if not api_gateway_id:
+                logr.info(
+                    f'Api gateway of {self.deployed_project_name_with_stage} does not exist yet and no custom domain '
+                    f'is configured. Allowed host will be updated after the deployment.'
+                )
+                return
+
+            allowed_host = self.__gateway_host(api_gateway_id)
+
+        logr.info(f'Baking allowed host {allowed_host} into {self.deployed_project_name_with_stage} environment.')
+        self.project_environment['ALLOWED_HOST'] = allowed_host
 
-        logr.info('Deployment fully configured and successful!')
+    def __gateway_host(self, api_gateway_id: str) -> str:
+        """
+        Creates a host name of an api gateway.
+
+        :param api_gateway_id: Resource id of an api gateway.
+
+        :return: Host name.
+        """
+        return '{}.execute-api.{}.amazonaws.com'.format(api_gateway_id, self.aws_region)
+
+    def __generate_bucket_name(self) -> str:
+        """
+        Generates a unique name of a zappa bucket for the current deployment.
+
+        :return: Bucket name.
+        """
+        name = re.sub(r'[^a-z0-9-]+', '-', self.deployed_project_name_with_stage.lower())[:40].strip('-')
+        return f'zappa-{name}-{uuid.uuid4().hex[:12]}'
 
     def __clean(self):
         """
@@ -107,51 +535,95 @@ class ZappaDjangoDeploy:
 
         :return: No return.
         """
-        # Delete build leftovers
+        # Delete build leftovers (including checkpoints)
         logr.info(f'Deleting build leftovers for {self.deployed_project_name_with_stage}...')
-        try:
-            shutil.rmtree(self.DEFAULT_CLONE_PATH)
-        except FileNotFoundError:
-            pass
+        shutil.rmtree(self.workspace, ignore_errors=True)
+
+        # Configured buckets may be shared with other deployments, hence only an own bucket is deleted.
+        if not self.owns_zappa_bucket:
+            return
 
         # Delete upload leftovers
-        logr.info(f'Deleting zappa buckets for {self.deployed_project_name_with_stage}...')
-        # When deploying with zappa a lot of buckets are being created. Delete them.
-        S3BucketDeleter().delete_with_prefix('zappa')
+        logr.info(f'Deleting zappa bucket {self.zappa_bucket_name} for {self.deployed_project_name_with_stage}...')
+        try:
+            S3BucketDeleter(self.aws_region).delete(self.zappa_bucket_name)
+        except ClientError as ex:
+            if ex.response['Error']['Code'] != 'NoSuchBucket':
+                raise
 
     def __test(self):
         """
-        Runs projects tests.
+        Runs projects tests. Tests are skipped if they already passed for the same commit,
+        dependencies and environment.
 
         :return: No return.
         """
+        environment_hash = TestResultCache.environment_hash(self.project_environment)
+        key = TestResultCache.key(self.commit, self.dependency_hash, environment_hash)
+        passed = self.test_cache.get(key)
+
+        if passed and not self.force_tests:
+            logr.info(
+                f'Skipping tests for {self.deployed_project_name_with_stage}: commit {self.commit} already passed '
+                f'at {passed["passed_at"]} in {passed["wall_time"]:.1f}s (test run {key}).'
+            )
+            return
+
         # Create dotenv file for testing .
         self.__create_dot_env()
 
         test_command = (
             "cd {} "
             # Source the virtual env.
-            "&& . tmpenv/bin/activate "
+            "&& . {}/bin/activate "
             # Run django tests.
             "&& echo "
-            "&& python manage.py test --noinput".format(self.DEFAULT_CLONE_PATH)
+            "&& python manage.py test --noinput {}".format(
+                self.project_path,
+                self.virtualenv_path,
+                self.__parallel_argument()
+            )
         )
 
-        logr.info(f'Running tests for {self.deployed_project_name_with_stage}...')
-        success = run_bash(test_command)
-        assert success, 'Tests failed!'
-        logr.info(f'Tests succeeded for {self.deployed_project_name_with_stage}!')
+        logr.info(f'Running tests for {self.deployed_project_name_with_stage} (test run {key})...')
+        result = run_command(test_command)
+        assert result.ok, 'Tests failed!'
+        logr.info(f'Tests succeeded for {self.deployed_project_name_with_stage}! {result}.')
+
+        self.test_cache.record(key, {
+            'commit': self.commit,
+            'dependency_hash': self.dependency_hash,
+            'environment_hash': environment_hash,
+            'project': self.deployed_project_name_with_stage,
+            'passed_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'wall_time': result.wall_time,
+            'cpu_time': result.cpu_time,
+        })
 
         # After testing delete the file.
         self.__delete_dot_env()
 
+    def __parallel_argument(self) -> str:
+        """
+        Creates an argument of django test command which controls parallel test processes.
+
+        :return: Command argument.
+        """
+        if self.test_workers == 0:
+            return '--parallel'
+
+        if self.test_workers > 1:
+            return f'--parallel {self.test_workers}'
+
+        return ''
+
     def __create_dot_env(self):
         """
         Creates dot-env file for storing environment.
 
         :return: No return.
         """
-        with open(self.DEFAULT_CLONE_PATH + '/.env', 'w') as env:
+        with open(self.project_path + '/.env', 'w') as env:
             for key, value in self.project_environment.items():
                 env.write(key + '=' + value + '\n')
 
@@ -161,48 +633,81 @@ class ZappaDjangoDeploy:
 
         :return: No return.
         """
-        os.remove(self.DEFAULT_CLONE_PATH + '/.env')
+        os.remove(self.project_path + '/.env')
 
     def __install(self):
         """
-        Installs projects with it's dependencies.
+        Installs projects with it's dependencies. A cached virtual environment is reused if
+        project dependencies did not change (install.sh does not run then). The environment is held
+        until the deployment ends.
+
+        :return: No return.
+        """
+        logr.info(f'Installing {self.deployed_project_name_with_stage} project...')
+        self.dependency_hash = self.virtualenv_cache.dependency_hash(self.project_path, self.stage)
+        environment = self.__environment_hold.enter_context(
+            self.virtualenv_cache.get(self.dependency_hash, self.__build_virtualenv)
+        )
+        self.virtualenv_path = environment.path
+        self.metrics.phases['install'].bytes_downloaded += environment.bytes_downloaded
+        self.metrics.details['virtualenv_cached'] = environment.hit
+        logr.info('Installation succeeded!')
+
+    def __build_virtualenv(self, virtualenv_path: str):
+        """
+        Creates a virtual environment and installs project dependencies into it.
+
+        :param virtualenv_path: Path of the virtual environment.
 
         :return: No return.
         """
         install_command = (
             "cd {} "
-            "&& virtualenv tmpenv --python=python3"
-            "&& . tmpenv/bin/activate"
+            # Downloaded and built wheels are kept between builds.
+            "&& export PIP_CACHE_DIR={} "
+            "&& virtualenv {} --python={} "
+            "&& . {}/bin/activate "
             # Every nj project must contain install.sh script at the root directory
             # which will fully install an configure the system to successfully run the project.
-            "&& ./install.sh python {}"
+            "&& ./install.sh python {} "
             # Install zappa to enable deployment.
             "&& pip install zappa=={}".format(
-                self.DEFAULT_CLONE_PATH,
+                self.project_path,
+                self.virtualenv_cache.wheel_dir,
+                virtualenv_path,
+                self.virtualenv_cache.python,
+                virtualenv_path,
                 self.stage,
                 ZappaConfig.VERSION
             ))
 
-        logr.info(f'Installing {self.deployed_project_name_with_stage} project...')
         success = run_bash(install_command)
         assert success, 'Installation failed!'
-        logr.info('Installation succeeded!')
 
     def __deploy(self):
         """
-        Deploys project.
+        Deploys project. Deployment is skipped if the same package is already deployed.
 
         :return: None.
         """
-        deploy_command = (
-            "cd {} "
-            # We activate a virtual environment because zappa uses the active python
-            # environment to package the dependencies.
-            "&& . tmpenv/bin/activate "
-            "&& ( zappa update {} || zappa deploy {} )"
-        ).format(self.DEFAULT_CLONE_PATH, self.stage, self.stage)
+        self.deployer = ZappaDeployer(
+            self.project_path,
+            self.stage,
+            self.virtualenv_path,
+            function_name=self.deployed_project_name_with_stage,
+            region=self.aws_region,
+            bucket_name=self.zappa_bucket_name
+        )
 
         logr.info(f'Deploying {self.deployed_project_name_with_stage}...')
-        success = run_bash(deploy_command)
-        assert success, 'Deployment failed.'
+        deployer_metrics = self.deployer.deploy(self.force_deploy)
+
+        # Deployer steps run inside the deploy phase, hence their commands are already accounted for.
+        self.metrics.package_size = deployer_metrics.package_size
+        self.metrics.phases['deploy'].bytes_uploaded += deployer_metrics.bytes_uploaded
+        self.metrics.details['deploy_steps'] = {
+            name: phase.to_dict() for name, phase in deployer_metrics.phases.items()
+        }
+
+        assert deployer_metrics, 'Deployment failed.'
         logr.info(f'Deployment for {self.deployed_project_name_with_stage} was successfull!')
@@ -0,0 +1,77 @@
+"""
+Compares boto3 client creation of a single stack deployment with and without ClientPool.
+
+Without the pool a deployment created three S3 clients, two S3 resources and a cloud-formation
+client (every one with its own connection pool). With the pool the same actions share clients.
+Actions are only constructed (no AWS calls are made), hence no credentials are needed.
+
+Usage:
+    python benchmarks/client_pool_benchmark.py [deployments]
+"""
+import sys
+import time
+import boto3
+
+from aws_infrastructure_sdk.client_pool import ClientPool
+from aws_infrastructure_sdk.cloud_formation.stack.stack_deployer import StackDeployer
+from aws_infrastructure_sdk.cloud_formation.stack.stack_waiter import StackWaiter
+from aws_infrastructure_sdk.s3.s3_bucket_creator import S3BucketCreator
+from aws_infrastructure_sdk.s3.s3_uploader import S3Uploader
+
+REGION = 'eu-west-1'
+
+
+def unpooled_deployment() -> int:
+    """
+    Creates clients the way a deployment did before ClientPool.
+
+    :return: Amount of created connection pools (every client and resource owns one).
+    """
+    boto3.client('cloudformation', region_name=REGION)
+
+    for _ in range(3):
+        boto3.client('s3', region_name=REGION)
+
+    for _ in range(2):
+        boto3.resource('s3', region_name=REGION)
+
+    return 6
+
+
+def pooled_deployment() -> None:
+    """
+    Constructs actions a deployment (with a template uploaded to S3) uses.
+
+    :return: No return.
+    """
+    StackDeployer('benchmark-stack', REGION)
+    S3BucketCreator('benchmark-bucket', REGION)
+    S3Uploader('benchmark-bucket', content_addressed=True, region=REGION).s3_resource
+    StackWaiter('benchmark-stack', region=REGION)
+
+
+def main(deployments: int) -> None:
+    start = time.perf_counter()
+    pools = sum(unpooled_deployment() for _ in range(deployments))
+    unpooled = time.perf_counter() - start
+
+    ClientPool.clear()
+
+    start = time.perf_counter()
+    for _ in range(deployments):
+        pooled_deployment()
+    pooled = time.perf_counter() - start
+
+    stats = ClientPool.stats()
+
+    print(f'Deployments: {deployments}')
+    print(f'Without pool: {unpooled / deployments * 1000:.1f}ms per deployment, {pools} connection pools.')
+    print(
+        f'With pool: {pooled / deployments * 1000:.1f}ms per deployment, '
+        f'{stats["clients_created"] + stats["resources_created"]} connection pools.'
+    )
+    print(f'Pool stats: {stats}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,110 @@
+"""
+Compares per-id ResourceDescriber.describe calls with the bulk ResourceDescriber.describe_many path.
+
+Cloud-formation is replaced with a stubbed client which answers every call after a simulated
+round trip latency, hence no credentials are needed. Every made API call is counted.
+
+Usage:
+    python benchmarks/resource_describer_benchmark.py [resources] [latency in seconds]
+"""
+import datetime
+import os
+import sys
+import time
+
+from botocore.stub import Stubber
+from aws_infrastructure_sdk.cloud_formation.stack.resource_describer import ResourceDescriber
+
+# ResourceDescriber uses the default session region.
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-west-1')
+
+STACK_NAME = 'benchmark-stack'
+CREATED = datetime.datetime(2020, 1, 1)
+PAGE_SIZE = 100
+
+
+def summary(logical_id: str) -> dict:
+    return {
+        'LogicalResourceId': logical_id,
+        'PhysicalResourceId': logical_id.lower() + '-physical',
+        'ResourceType': 'AWS::S3::Bucket',
+        'ResourceStatus': 'CREATE_COMPLETE',
+        'LastUpdatedTimestamp': CREATED,
+    }
+
+
+def run(describer: ResourceDescriber, logical_ids: list, latency: float, bulk: bool) -> tuple:
+    """
+    Resolves all logical ids either one by one or in bulk.
+
+    :return: A tuple of (API calls, elapsed seconds).
+    """
+    client = describer.cf_client
+    calls = []
+
+    def round_trip(**kwargs) -> None:
+        calls.append(kwargs['event_name'])
+        time.sleep(latency)
+
+    stubber = Stubber(client)
+
+    if bulk:
+        stubber.add_response('describe_stacks', {'Stacks': [{
+            'StackName': STACK_NAME,
+            'StackStatus': 'CREATE_COMPLETE',
+            'CreationTime': CREATED,
+        }]})
+
+        pages = [logical_ids[i:i + PAGE_SIZE] for i in range(0, len(logical_ids), PAGE_SIZE)]
+        for number, page in enumerate(pages):
+            response = {'StackResourceSummaries': [summary(logical_id) for logical_id in page]}
+            if number < len(pages) - 1:
+                response['NextToken'] = str(number)
+
+            stubber.add_response('list_stack_resources', response)
+    else:
+        for logical_id in logical_ids:
+            detail = dict(summary(logical_id), StackName=STACK_NAME)
+            stubber.add_response('describe_stack_resource', {'StackResourceDetail': detail})
+
+    start = time.perf_counter()
+
+    with stubber:
+        # Stubber answers calls in a before-call handler, hence the latency is simulated before it.
+        client.meta.events.register('before-parameter-build.cloudformation', round_trip)
+
+        try:
+            if bulk:
+                describer.invalidate()
+                describer.describe_many(logical_ids)
+            else:
+                for logical_id in logical_ids:
+                    describer.describe(logical_id)
+        finally:
+            client.meta.events.unregister('before-parameter-build.cloudformation', round_trip)
+
+    return len(calls), time.perf_counter() - start
+
+
+def main(resources: int, latency: float) -> None:
+    logical_ids = [f'Resource{number}' for number in range(resources)]
+    describer = ResourceDescriber(STACK_NAME)
+
+    per_id_calls, per_id_time = run(describer, logical_ids, latency, bulk=False)
+    bulk_calls, bulk_time = run(describer, logical_ids, latency, bulk=True)
+
+    start = time.perf_counter()
+    describer.describe_many(logical_ids)
+    cached_time = time.perf_counter() - start
+
+    print(f'Resources: {resources}, simulated latency: {latency * 1000:.0f}ms')
+    print(f'Per id: {per_id_calls} calls, {per_id_time:.3f}s')
+    print(f'Bulk: {bulk_calls} calls, {bulk_time:.3f}s')
+    print(f'Bulk (cached index): 0 calls, {cached_time:.3f}s')
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 40,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    )
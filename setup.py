@@ -15,6 +15,9 @@ setup(
         'aws-cf-custom-resources',
         'aws-lambda'
     ],
+    extras_require={
+        'brotli': ['brotli']
+    },
     author='Laimonas Sutkus',
     author_email='laimonas.sutkus@gmail.com',
     keywords='AWS SDK CloudFormation Zappa Infrastructure Cloud',
@@ -0,0 +1,18 @@
+import pytest
+
+from aws_infrastructure_sdk.client_pool import ClientPool
+
+
+@pytest.fixture(autouse=True)
+def aws_environment(monkeypatch) -> None:
+    """
+    Fake credentials and region for stubbed clients. Pooled clients are dropped, so every test
+    gets clients created with this environment.
+    """
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'eu-west-1')
+
+    ClientPool.clear()
+    yield
+    ClientPool.clear()
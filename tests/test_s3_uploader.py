@@ -0,0 +1,60 @@
+import hashlib
+import json
+
+from botocore.stub import ANY, Stubber
+from aws_infrastructure_sdk.s3.s3_uploader import S3Uploader
+
+REGION = 'eu-west-1'
+BUCKET = 'test-bucket'
+
+
+def test_upload_bytes() -> None:
+    uploader = S3Uploader(BUCKET, content_addressed=True, region=REGION)
+    payload = b'payload' * 100
+
+    with Stubber(uploader.s3_client) as stubber:
+        stubber.add_client_error('head_object', 'NoSuchKey', http_status_code=404)
+        stubber.add_response('put_object', {})
+
+        uploader.upload_bytes(payload)
+
+        stubber.assert_no_pending_responses()
+
+    assert uploader.last_key == hashlib.sha256(payload).hexdigest()
+
+
+def test_sync_directory_with_gzip(tmp_path) -> None:
+    content = 'body { color: red; }\n' * 100
+    (tmp_path / 'style.css').write_text(content)
+
+    uploader = S3Uploader(BUCKET, region=REGION)
+    manifest_key = S3Uploader.SYNC_MANIFEST_NAME
+
+    uploads = []
+    uploader.s3_client.meta.events.register(
+        'provide-client-params.s3.PutObject',
+        lambda params, **kwargs: uploads.append(dict(params))
+    )
+
+    with Stubber(uploader.s3_client) as stubber:
+        stubber.add_response('list_objects_v2', {'KeyCount': 0}, {'Bucket': BUCKET, 'Prefix': ''})
+        stubber.add_client_error('get_object', 'NoSuchKey', http_status_code=404)
+        stubber.add_response('put_object', {})
+        stubber.add_response('put_object', {}, {
+            'Bucket': BUCKET,
+            'Key': manifest_key,
+            'Body': ANY,
+            'ContentType': 'application/json',
+        })
+
+        result = uploader.sync_directory(str(tmp_path), compression='gzip')
+
+        stubber.assert_no_pending_responses()
+
+    assert result.uploaded == ['style.css']
+    assert uploads[0]['Key'] == 'style.css'
+    assert uploads[0]['ContentEncoding'] == 'gzip'
+    assert result.bytes_uploaded < len(content)
+
+    manifest = json.loads(uploads[1]['Body'])
+    assert manifest['style.css']['encoding'] == 'gzip'